@@ -0,0 +1,55 @@
+import hmac
+import os
+from typing import Optional,Tuple
+from fastapi import Header,HTTPException,status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+import metrics
+from cache import StatsCache
+from database import SessionLocal,engine
+from models import ChatToken
+
+# Valid tokens are trusted this long before being checked again.
+CHAT_TOKEN_CACHE_TTL=float(os.environ.get('CHAT_TOKEN_CACHE_TTL',60))
+# Invalid tokens are rejected without a query for this long.
+CHAT_TOKEN_NEGATIVE_TTL=float(os.environ.get('CHAT_TOKEN_NEGATIVE_TTL',10))
+CHAT_TOKEN_CACHE_SIZE=int(os.environ.get('CHAT_TOKEN_CACHE_SIZE',10000))
+# Bearer token for operational endpoints (/metrics, /internal/*); they are disabled without it.
+INTERNAL_API_TOKEN=os.environ.get('INTERNAL_API_TOKEN')
+
+valid_tokens=StatsCache("chat_token_cache",maxsize=CHAT_TOKEN_CACHE_SIZE,ttl=CHAT_TOKEN_CACHE_TTL)
+invalid_tokens=StatsCache("chat_token_negative_cache",maxsize=CHAT_TOKEN_CACHE_SIZE,ttl=CHAT_TOKEN_NEGATIVE_TTL)
+
+def ensure_chat_token_index():
+    for index in ChatToken.__table__.indexes:
+        index.create(engine,checkfirst=True)
+
+def verify_internal_token(authorization:Optional[str]=Header(None)):
+    if not INTERNAL_API_TOKEN or not authorization or not hmac.compare_digest(authorization,f"Bearer {INTERNAL_API_TOKEN}"):
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED)
+
+def lookup_chat_token(user_id:str,session_token:str)->bool:
+    db=SessionLocal()
+    try:
+        with metrics.timer("ws.token_query_ms"):
+            return db.query(ChatToken.id).filter(ChatToken.userId==user_id,ChatToken.sessionToken==session_token).first() is not None
+    finally:
+        db.close()
+
+async def verify_chat_token(user_id:str,session_token:str)->bool:
+    key:Tuple[str,str]=(user_id,session_token)
+    if valid_tokens.get(key,None):
+        return True
+    if invalid_tokens.get(key,None):
+        return False
+    valid=await run_in_threadpool(lookup_chat_token,user_id,session_token)
+    (valid_tokens if valid else invalid_tokens).set(key,True)
+    return valid
+
+@event.listens_for(ChatToken,'after_insert')
+def _forget_invalid_token(mapper,connection,target:ChatToken):
+    invalid_tokens.invalidate((target.userId,target.sessionToken))
+
+@event.listens_for(ChatToken,'after_delete')
+def _forget_valid_token(mapper,connection,target:ChatToken):
+    valid_tokens.invalidate((target.userId,target.sessionToken))
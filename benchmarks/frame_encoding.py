@@ -0,0 +1,62 @@
+"""Per-token CPU and bytes of the legacy vs compact websocket frames.
+
+    python benchmarks/frame_encoding.py --tokens 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessageChunk
+
+from streaming import make_protocol
+
+METADATA = {
+    "thread_id": "00000000-0000-0000-0000-000000000000",
+    "langgraph_step": 1,
+    "langgraph_node": "agent",
+    "langgraph_triggers": ("branch:to:agent",),
+    "langgraph_path": ("__pregel_pull", "agent"),
+    "langgraph_checkpoint_ns": "agent:90eb0dc0-11bf-0224-e656-5b10b2494301",
+    "ls_provider": "openai",
+    "ls_model_name": "gpt-4.1-mini",
+    "ls_model_type": "chat",
+    "ls_temperature": 0.4,
+}
+
+
+def run(protocol, events):
+    start = time.perf_counter()
+    frames = 0
+    size = 0
+    for event in events:
+        for frame in protocol.frames(event):
+            frames += 1
+            size += len(protocol.serialize(frame).encode())
+    for frame in protocol.flush():
+        frames += 1
+        size += len(protocol.serialize(frame).encode())
+    return time.perf_counter() - start, frames, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=20000)
+    args = parser.parse_args()
+    events = [(AIMessageChunk(content=" token", id="run-1"), METADATA) for _ in range(args.tokens)]
+
+    print(f"{'protocol':<28} {'us/token':>9} {'frames':>8} {'bytes/token':>12}")
+    for label, protocol in [
+        ("legacy", make_protocol("legacy")),
+        ("compact", make_protocol("compact", 0, 0)),
+        ("compact coalesce 256B", make_protocol("compact", 0, 256)),
+        ("compact coalesce 50ms", make_protocol("compact", 50, 0)),
+    ]:
+        elapsed, frames, size = run(protocol, events)
+        print(f"{label:<28} {elapsed / args.tokens * 1e6:>9.2f} {frames:>8} {size / args.tokens:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
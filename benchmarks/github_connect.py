@@ -0,0 +1,56 @@
+"""Cold vs warm GitHub connect latency.
+
+Compares the old per-connection GitHubAPIWrapper bootstrap with the shared
+installation registry (first call = cold, later calls = warm).
+
+    GITHUB_APP_ID=... GITHUB_APP_PRIVATE_FILE=key.pem \\
+        python benchmarks/github_connect.py owner/repo --runs 10
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from custom_tools.github_api_wrapper import GitHubAPIWrapper
+from metrics import summarize
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000
+
+
+def report(label, values):
+    s = summarize(values)
+    print(f"{label:<22} n={s['count']:<4} p50={s['p50']:>8.1f}ms p95={s['p95']:>8.1f}ms max={s['max']:>8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("repository")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with open(os.environ['GITHUB_APP_PRIVATE_FILE']) as f:
+        private_key = f.read()
+
+    legacy = [
+        timed(GitHubAPIWrapper, github_app_private_key=private_key, github_repository=args.repository)
+        for _ in range(args.runs)
+    ]
+    cold = [timed(GitHubAPIWrapper.from_registry, args.repository)]
+    warm = [timed(GitHubAPIWrapper.from_registry, args.repository) for _ in range(args.runs)]
+
+    report("legacy bootstrap", legacy)
+    report("registry cold", cold)
+    report("registry warm", warm)
+
+
+if __name__ == "__main__":
+    main()
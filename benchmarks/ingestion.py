@@ -0,0 +1,127 @@
+"""Meeting indexing throughput: sequential vs pipelined.
+
+Indexes a synthetic transcript of N chunks and reports chunks/sec for the
+old shape (embed everything, then upload everything, one request at a time)
+and for ingestion.index_chunks, then the time to index the same meeting
+again through index_meeting (nothing to embed or upload). By default
+embedding and upload calls are simulated with fixed latencies; --live uses the real OpenAI embeddings and
+Pinecone index (writes to the "benchmark" namespace).
+
+    python benchmarks/ingestion.py --chunks 200 1000 --embed-ms 400 --upsert-ms 150
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from langchain_core.documents import Document
+
+import ingestion
+
+
+class SimulatedEmbeddings:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return [[0.0] * 8 for _ in texts]
+
+
+class SimulatedIndex:
+    def __init__(self, latency):
+        self.latency = latency
+        self.ids = set()
+
+    def upsert(self, vectors, **kwargs):
+        time.sleep(self.latency)
+        self.ids.update(v["id"] for v in vectors)
+
+    def list(self, prefix):
+        yield [vector_id for vector_id in self.ids if vector_id.startswith(prefix)]
+
+    def delete(self, ids):
+        self.ids.difference_update(ids)
+
+
+class NamespacedIndex:
+    def __init__(self, index, namespace):
+        self.index = index
+        self.namespace = namespace
+
+    def upsert(self, vectors):
+        self.index.upsert(vectors=vectors, namespace=self.namespace)
+
+    def list(self, prefix):
+        return self.index.list(prefix=prefix, namespace=self.namespace)
+
+    def delete(self, ids):
+        self.index.delete(ids=ids, namespace=self.namespace)
+
+
+class MemoryEmbeddingCache:
+    def __init__(self):
+        self.rows = {}
+
+    def get_many(self, model, hashes):
+        return {h: self.rows[(model, h)] for h in hashes if (model, h) in self.rows}
+
+    def put_many(self, model, vectors):
+        self.rows.update({(model, h): v for h, v in vectors.items()})
+
+
+def make_chunks(n):
+    text = "[Speaker]: so the next thing we need to look at is the deployment plan for friday " * 5
+    chunks = [Document(page_content=f"{i} {text}", metadata={"meeting_id": "benchmark", "source": "meeting"}) for i in range(n)]
+    return ingestion.assign_ids("benchmark", chunks)
+
+
+def sequential(index, embeddings, chunks, batch_size):
+    # What PineconeVectorStore.add_documents did: embed all, then upload all.
+    start = time.perf_counter()
+    values = []
+    for batch in ingestion.batched(chunks, batch_size):
+        values.extend(embeddings.embed_documents([c.page_content for c in batch]))
+    vectors = ingestion.to_vectors(chunks, values)
+    for batch in ingestion.batched(vectors, batch_size):
+        index.upsert(vectors=batch)
+    return len(chunks) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--batch-size", type=int, default=ingestion.INGEST_EMBED_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=ingestion.INGEST_EMBED_CONCURRENCY)
+    parser.add_argument("--embed-ms", type=float, default=400)
+    parser.add_argument("--upsert-ms", type=float, default=150)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    if args.live:
+        from utils import get_embeddings, get_pinecone
+        embeddings = get_embeddings()
+        index = NamespacedIndex(get_pinecone().Index(os.environ['PINECONE_VECTOR_NAME']), "benchmark")
+    else:
+        embeddings = SimulatedEmbeddings(args.embed_ms / 1000)
+        index = SimulatedIndex(args.upsert_ms / 1000)
+
+    for n in args.chunks:
+        chunks = make_chunks(n)
+        before = sequential(index, embeddings, chunks, args.batch_size)
+        after = ingestion.index_chunks(index, embeddings, chunks, args.batch_size, args.concurrency)["chunks_per_sec"]
+        cache = MemoryEmbeddingCache()
+        meeting_id = f"benchmark-{n}"
+        first = ingestion.index_meeting(index, embeddings, meeting_id, make_chunks(n), cache=cache)["seconds"]
+        again = ingestion.index_meeting(index, embeddings, meeting_id, make_chunks(n), cache=cache)["seconds"]
+        print(f"{n:>6} chunks  sequential {before:>8.1f} chunks/s  pipelined {after:>8.1f} chunks/s  x{after / before:.1f}"
+              f"  first index {first:.2f}s  re-index {again:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
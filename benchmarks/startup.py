@@ -0,0 +1,95 @@
+"""App startup time.
+
+Reports, over several fresh processes:
+
+- import: time to `import main` (nothing should connect here)
+- ready: time from launching uvicorn until `GET /` answers, i.e. the lifespan
+  (tables, toolkits, embedding/Pinecone clients, async graph pool) is done
+
+and the slowest modules of one `python -X importtime -c "import main"` run.
+Needs the same environment (.env) as the app.
+
+    python benchmarks/startup.py --runs 5
+"""
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from metrics import summarize
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_time():
+    out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1]) * 1000
+
+
+def time_to_ready(timeout):
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"server exited with {server.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                    return (time.perf_counter() - start) * 1000
+            except httpx.TransportError:
+                pass
+            time.sleep(0.02)
+        raise TimeoutError("server did not become ready")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def slowest_imports(count):
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT, capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(.+)", line)
+        if match and len(match.group(2)) <= 3:  # top-level imports of main and their direct children
+            rows.append((int(match.group(1)) / 1000, match.group(3)))
+    return sorted(rows, reverse=True)[:count]
+
+
+def report(label, s):
+    print(f"{label:<8} n={s['count']:<3} p50={s['p50']:>8.1f}ms avg={s['avg']:>8.1f}ms max={s['max']:>8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    report("import", summarize([import_time() for _ in range(args.runs)]))
+    report("ready", summarize([time_to_ready(args.timeout) for _ in range(args.runs)]))
+    print("slowest imports (cumulative):")
+    for ms, name in slowest_imports(args.top):
+        print(f"  {ms:>8.1f}ms {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Meeting summary latency vs transcript length: one call vs map-reduce.
+
+For each transcript length (in tokens) reports the latency of the old single
+prompt, of summarization.summarize, and of summarize resumed after a run
+that lost half of its section summaries. By default the model is simulated:
+a call takes --base-ms plus --prefill-ms per 1k prompt tokens plus
+--decode-ms per output token. --live uses llm.Llm instead (the single-call
+column is skipped for transcripts over the model's context).
+
+    python benchmarks/summarization.py --tokens 5000 20000 80000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+
+from langchain_core.messages import AIMessage
+
+import summarization
+from tokens import CHARS_PER_TOKEN, approx_tokens
+
+
+class SimulatedLlm:
+    model_name = "simulated"
+
+    def __init__(self, base_ms, prefill_ms, decode_ms, output_tokens):
+        self.base_ms = base_ms
+        self.prefill_ms = prefill_ms
+        self.decode_ms = decode_ms
+        self.output_tokens = output_tokens
+
+    def invoke(self, prompt):
+        prompt_tokens = approx_tokens(prompt)
+        time.sleep((self.base_ms + self.prefill_ms * prompt_tokens / 1000 + self.decode_ms * self.output_tokens) / 1000)
+        return AIMessage(content="word " * (self.output_tokens * CHARS_PER_TOKEN // 5))
+
+
+class MemoryCache:
+    def __init__(self):
+        self.rows = {}
+
+    def get_many(self, meeting_id, hashes):
+        return {h: self.rows[(meeting_id, h)] for h in hashes if (meeting_id, h) in self.rows}
+
+    def put(self, meeting_id, key, summary):
+        self.rows[(meeting_id, key)] = summary
+
+
+def make_transcript(n_tokens):
+    line = "[Speaker]: so the next thing we need to look at is the deployment plan for friday\n"
+    return line * (n_tokens * CHARS_PER_TOKEN // len(line) + 1)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, nargs="+", default=[5000, 20000, 80000])
+    parser.add_argument("--section-tokens", type=int, default=summarization.SUMMARY_SECTION_TOKENS)
+    parser.add_argument("--concurrency", type=int, default=summarization.SUMMARY_CONCURRENCY)
+    parser.add_argument("--base-ms", type=float, default=300)
+    parser.add_argument("--prefill-ms", type=float, default=100)
+    parser.add_argument("--decode-ms", type=float, default=15)
+    parser.add_argument("--output-tokens", type=int, default=400)
+    parser.add_argument("--context-tokens", type=int, default=128000)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    if args.live:
+        from llm import Llm as llm
+    else:
+        llm = SimulatedLlm(args.base_ms, args.prefill_ms, args.decode_ms, args.output_tokens)
+
+    for n in args.tokens:
+        text = make_transcript(n)
+        if n <= args.context_tokens:
+            single = f"{timed(llm.invoke, summarization.SUMMARY_PROMPT.format(text=text)):>7.2f}s"
+        else:
+            single = "too long"
+        options = dict(section_tokens=args.section_tokens, concurrency=args.concurrency)
+        cache = MemoryCache()
+        mapped = timed(summarization.summarize, llm, f"benchmark-{n}", text, cache=cache, **options)
+        # drop half the cached section summaries and the combine steps, as if the run had failed midway
+        for key in list(cache.rows)[::2]:
+            del cache.rows[key]
+        resumed = timed(summarization.summarize, llm, f"benchmark-{n}", text, cache=cache, **options)
+        sections = len(summarization.sections(text, args.section_tokens))
+        print(f"{n:>7} tokens  {sections:>3} sections  single call {single:>8}  map-reduce {mapped:>7.2f}s  resumed {resumed:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
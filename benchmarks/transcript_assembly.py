@@ -0,0 +1,93 @@
+"""Transcript download + caption assembly: buffered vs streaming.
+
+Simulates the Attendee response body arriving in 64 KiB chunks and compares
+the old path (join body, json.loads, `+=` concatenation) with the streaming
+parser + single-pass assembly. Reports time and peak traced memory (the
+body itself is excluded, as it never exists in one piece when streamed).
+
+    python benchmarks/transcript_assembly.py --segments 10000 50000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcripts import JSONArrayStream, caption_line, to_segment
+
+CHUNK = 64 * 1024
+
+
+def make_body(n):
+    segments = [
+        {
+            "speaker_name": f"Speaker {i % 7}",
+            "speaker_uuid": f"uuid-{i % 7}",
+            "speaker_user_uuid": None,
+            "timestamp_ms": i * 4000,
+            "duration_ms": 3500,
+            "transcription": {"transcript": "so the next thing we need to look at is the deployment plan for friday " * 2},
+        }
+        for i in range(n)
+    ]
+    return json.dumps(segments).encode()
+
+
+def chunks(body):
+    for i in range(0, len(body), CHUNK):
+        yield body[i:i + CHUNK]
+
+
+def buffered(body):
+    transcript = json.loads(b"".join(chunks(body)))
+    final_captions = ""
+    for chunk in transcript:
+        if chunk['transcription']['transcript']:
+            final_captions += f"[{chunk['speaker_name']}]: {chunk['transcription']['transcript']}\n"
+    return final_captions
+
+
+def streaming(body):
+    parser = JSONArrayStream()
+    parts = []
+    for data in chunks(body):
+        for segment in parser.feed(data):
+            segment = to_segment(segment)
+            if segment is not None:
+                parts.append(caption_line(segment))
+    parser.feed(b"", final=True)
+    return "".join(parts)
+
+
+def measure(fn, body):
+    start = time.perf_counter()
+    result = fn(body)
+    elapsed = time.perf_counter() - start
+    # separate run, tracemalloc slows allocation-heavy code down a lot
+    tracemalloc.start()
+    fn(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--segments", type=int, nargs="+", default=[10000, 50000])
+    args = parser.parse_args()
+    print(f"{'segments':>9} {'body MB':>8} {'path':<10} {'ms':>9} {'peak MB':>8}")
+    for n in args.segments:
+        body = make_body(n)
+        expected = None
+        for label, fn in [("buffered", buffered), ("streaming", streaming)]:
+            result, elapsed, peak = measure(fn, body)
+            expected = expected or result
+            assert result == expected
+            print(f"{n:>9} {len(body) / 1e6:>8.1f} {label:<10} {elapsed * 1000:>9.1f} {peak / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
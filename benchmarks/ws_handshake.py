@@ -0,0 +1,63 @@
+"""Websocket handshake latency percentiles.
+
+Opens and closes sockets against a live server and reports p50/p95/p99 of the
+time until the server accepted, for a valid token (repeated, so it exercises
+the verification cache) and for an invalid token (negative cache). Run it
+before and after a change to compare, the server's own view is
+`ws.handshake_ms` in GET /metrics.
+
+    python benchmarks/ws_handshake.py --runs 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import websockets
+from metrics import summarize
+from ws_load import WS_BASE, get_test_user, new_thread
+
+
+async def handshake(uri):
+    start = time.perf_counter()
+    try:
+        async with websockets.connect(uri):
+            elapsed = time.perf_counter() - start
+    except Exception:
+        elapsed = time.perf_counter() - start
+    return elapsed * 1000
+
+
+async def measure(uri, runs, concurrency):
+    results = []
+    for i in range(0, runs, concurrency):
+        batch = min(concurrency, runs - i)
+        results.extend(await asyncio.gather(*(handshake(uri) for _ in range(batch))))
+    return summarize(results)
+
+
+def report(label, s):
+    print(f"{label:<16} n={s['count']:<5} p50={s['p50']:>7.1f}ms p95={s['p95']:>7.1f}ms p99={s['p99']:>7.1f}ms max={s['max']:>7.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    db, user_id = get_test_user()
+    thread_id = new_thread(db, user_id)
+    db.close()
+    report("valid token", await measure(f"{WS_BASE}/ws/{user_id}/{thread_id}", args.runs, args.concurrency))
+    report("invalid token", await measure(f"{WS_BASE}/ws/{user_id}/invalid-token", args.runs, args.concurrency))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""Concurrent-socket load test for the /ws chat endpoint.
+
+Runs the same prompt over 1..N concurrent sockets against a live server and
+reports wall time and throughput per concurrency level. With the async graph
+the wall time should stay roughly flat as concurrency grows instead of growing
+linearly (which is what a blocked event loop looks like).
+
+    python benchmarks/ws_load.py --levels 1 4 16 --message "Hello"
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import websockets
+from database import SessionLocal
+from models import User, ChatToken, Project
+
+WS_BASE = os.environ.get("WS_BASE", "ws://localhost:8000")
+
+
+def get_test_user():
+    db = SessionLocal()
+    user = db.query(User).filter(User.email == 'loadtest@test.com').first()
+    if user is None:
+        user = User(name="load test user", email='loadtest@test.com', password='testpass')
+        db.add(user)
+        db.commit()
+    if user.projectId is None:
+        project = Project(name="Load Test Project", userId=user.id)
+        db.add(project)
+        db.commit()
+        user.projectId = project.id
+        db.commit()
+    return db, user.id
+
+
+def new_thread(db, user_id):
+    ct = ChatToken(userId=user_id)
+    db.add(ct)
+    db.commit()
+    return ct.sessionToken
+
+
+async def one_chat(user_id, thread_id, message):
+    start = time.perf_counter()
+    first = None
+    frames = 0
+    async with websockets.connect(f"{WS_BASE}/ws/{user_id}/{thread_id}") as ws:
+        await ws.send(message)
+        async for _ in ws:
+            if first is None:
+                first = time.perf_counter() - start
+            frames += 1
+    return first or 0.0, time.perf_counter() - start, frames
+
+
+async def run_level(db, user_id, level, message):
+    threads = [new_thread(db, user_id) for _ in range(level)]
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one_chat(user_id, t, message) for t in threads))
+    wall = time.perf_counter() - start
+    ttfts = sorted(r[0] for r in results)
+    totals = sorted(r[1] for r in results)
+    frames = sum(r[2] for r in results)
+    return {
+        "sockets": level,
+        "wall_s": wall,
+        "chats_per_s": level / wall,
+        "frames_per_s": frames / wall,
+        "ttft_p50_s": ttfts[len(ttfts) // 2],
+        "total_p50_s": totals[len(totals) // 2],
+        "total_max_s": totals[-1],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--message", default="Hello, reply with one short sentence.")
+    args = parser.parse_args()
+
+    db, user_id = get_test_user()
+    baseline = None
+    print(f"{'sockets':>8} {'wall_s':>8} {'chats/s':>8} {'frames/s':>9} {'ttft_p50':>9} {'p50_s':>7} {'max_s':>7} {'scaling':>8}")
+    for level in args.levels:
+        r = await run_level(db, user_id, level, args.message)
+        if baseline is None:
+            baseline = r["chats_per_s"] / r["sockets"]
+        # 1.0 means perfectly serialized, `sockets` means perfectly parallel
+        scaling = r["chats_per_s"] / baseline
+        print(f"{r['sockets']:>8} {r['wall_s']:>8.2f} {r['chats_per_s']:>8.2f} {r['frames_per_s']:>9.1f} "
+              f"{r['ttft_p50_s']:>9.2f} {r['total_p50_s']:>7.2f} {r['total_max_s']:>7.2f} {scaling:>8.2f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+import threading
+from typing import Any,Callable,Hashable,Optional
+from cachetools import TLRUCache,TTLCache
+import metrics
+
+MISSING=object()
+
+class StatsCache:
+    """Thread-safe TTL cache whose hit/miss counters are published to `metrics` under `name`."""
+
+    # ttu(key,value,now) instead of ttl gives every entry its own expiry time
+    def __init__(self,name:str,maxsize:int,ttl:Optional[float]=None,ttu:Optional[Callable[[Hashable,Any,float],float]]=None):
+        self.name=name
+        self.cache=TLRUCache(maxsize=maxsize,ttu=ttu) if ttu else TTLCache(maxsize=maxsize,ttl=ttl)
+        self.lock=threading.RLock()
+        self.hits=0
+        self.misses=0
+        self.invalidations=0
+        metrics.register_collector(name,self.stats)
+
+    def get(self,key:Hashable,default:Any=MISSING)->Any:
+        with self.lock:
+            value=self.cache.get(key,MISSING)
+            if value is MISSING:
+                self.misses+=1
+                return default
+            self.hits+=1
+            return value
+
+    def set(self,key:Hashable,value:Any):
+        with self.lock:
+            self.cache[key]=value
+
+    def invalidate(self,key:Hashable):
+        with self.lock:
+            if self.cache.pop(key,MISSING) is not MISSING:
+                self.invalidations+=1
+
+    def invalidate_where(self,predicate:Callable[[Hashable,Any],bool])->int:
+        """Drop every entry for which `predicate(key, value)` is true."""
+        with self.lock:
+            keys=[key for key,value in self.cache.items() if predicate(key,value)]
+            for key in keys:
+                del self.cache[key]
+            self.invalidations+=len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self.lock:
+            self.invalidations+=len(self.cache)
+            self.cache.clear()
+
+    def stats(self)->dict:
+        with self.lock:
+            lookups=self.hits+self.misses
+            return {
+                "size":len(self.cache),
+                "maxsize":self.cache.maxsize,
+                "ttl":getattr(self.cache,"ttl",None),
+                "hits":self.hits,
+                "misses":self.misses,
+                "invalidations":self.invalidations,
+                "hit_rate":self.hits/lookups if lookups else 0.0,
+            }
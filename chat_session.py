@@ -0,0 +1,88 @@
+import asyncio
+import json
+import os
+import time
+from fastapi import WebSocket,WebSocketDisconnect,status
+from langchain_core.runnables import RunnableConfig
+from graph import get_async_graph
+from streaming import LegacyProtocol,SendQueue,SlowConsumerError
+
+# Seconds without a client message before a persistent session is closed.
+WS_IDLE_TIMEOUT=float(os.environ.get('WS_IDLE_TIMEOUT',300))
+# Seconds between server heartbeats on a persistent session.
+WS_HEARTBEAT_INTERVAL=float(os.environ.get('WS_HEARTBEAT_INTERVAL',25))
+
+def parse_control(data:str):
+    """"ping"/"pong" for a legacy `{"type":..}` or compact `{"v":1,"t":..}` control frame, None for a chat message."""
+    if not data.startswith('{"'):
+        return None
+    try:
+        message=json.loads(data)
+    except ValueError:
+        return None
+    if not isinstance(message,dict):
+        return None
+    kind=message.get("type") if len(message)==1 else message.get("t") if len(message)==2 and "v" in message else None
+    if kind in ("ping","pong"):
+        return kind
+    return None
+
+class ChatSession:
+    """A websocket chat on one prepared config: one answer (run_once) or many, each ended by an `end` frame (run_persistent)."""
+
+    def __init__(self,websocket:WebSocket,config:RunnableConfig,protocol=None):
+        self.websocket=websocket
+        self.config=config
+        self.protocol=protocol or LegacyProtocol()
+        self.queue=SendQueue(websocket,self.protocol)
+        self.last_activity=time.monotonic()
+
+    async def answer(self,data:str):
+        async for event in get_async_graph().astream({"messages":[data]},config=self.config,stream_mode="messages"):
+            await self.queue.put_all(self.protocol.frames(event))
+        await self.queue.put_all(self.protocol.flush())
+
+    async def run_once(self):
+        self.queue.start()
+        try:
+            data=await self.websocket.receive_text()
+            await self.answer(data)
+            await self.queue.drain()
+        except SlowConsumerError:
+            return
+        finally:
+            self.queue.cancel()
+        await self.websocket.close()
+
+    async def heartbeat(self):
+        while True:
+            await asyncio.sleep(WS_HEARTBEAT_INTERVAL)
+            await self.queue.put(self.protocol.control("ping"))
+
+    async def run_persistent(self):
+        self.queue.start()
+        heartbeat=asyncio.create_task(self.heartbeat())
+        try:
+            while True:
+                timeout=WS_IDLE_TIMEOUT-(time.monotonic()-self.last_activity)
+                try:
+                    data=await asyncio.wait_for(self.websocket.receive_text(),timeout=max(timeout,0))
+                except asyncio.TimeoutError:
+                    heartbeat.cancel()
+                    await self.queue.drain()
+                    await self.websocket.close(code=status.WS_1000_NORMAL_CLOSURE,reason="Idle timeout")
+                    return
+                control=parse_control(data)
+                if control=="pong":
+                    continue
+                if control=="ping":
+                    await self.queue.put(self.protocol.control("pong"))
+                    continue
+                await self.answer(data)
+                await self.queue.put(self.protocol.control("end"))
+                self.last_activity=time.monotonic()
+        except (WebSocketDisconnect,SlowConsumerError):
+            pass
+        finally:
+            heartbeat.cancel()
+            self.queue.cancel()
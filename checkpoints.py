@@ -0,0 +1,176 @@
+# Retention for the LangGraph Postgres checkpoints: the `checkpoints.compact` job
+# keeps the last CHECKPOINT_KEEP_LAST per thread and drops threads matching
+# CHECKPOINT_PURGE_PREFIXES. Thread ids are /ws session tokens, so stats only show a hash.
+import hashlib
+import json
+import os
+import time
+from datetime import timedelta
+from typing import Dict,Iterable,List
+
+from sqlalchemy import text
+
+import jobs
+import metrics
+from database import SessionLocal,engine
+from idempotency import xact_lock
+from models import Job
+
+CHECKPOINT_KEEP_LAST=int(os.environ.get('CHECKPOINT_KEEP_LAST',20))
+CHECKPOINT_COMPACT_INTERVAL=float(os.environ.get('CHECKPOINT_COMPACT_INTERVAL',3600))
+# Threads compacted per job run; the rest waits for the next run.
+CHECKPOINT_COMPACT_BATCH=int(os.environ.get('CHECKPOINT_COMPACT_BATCH',500))
+CHECKPOINT_PURGE_PREFIXES=[p for p in os.environ.get('CHECKPOINT_PURGE_PREFIXES','meeting_').split(',') if p]
+# Largest threads listed under `checkpoints` in /metrics, refreshed every CHECKPOINT_STATS_TTL seconds.
+CHECKPOINT_STATS_TOP=int(os.environ.get('CHECKPOINT_STATS_TOP',20))
+CHECKPOINT_STATS_TTL=float(os.environ.get('CHECKPOINT_STATS_TTL',300))
+
+COMPACT_JOB="checkpoints.compact"
+
+OVERGROWN_THREADS=text("""
+    SELECT thread_id FROM checkpoints
+    GROUP BY thread_id, checkpoint_ns
+    HAVING count(*) > :keep
+    LIMIT :limit
+""")
+
+DELETE_OLD_CHECKPOINTS=text("""
+    DELETE FROM checkpoints c USING (
+        SELECT checkpoint_ns, checkpoint_id,
+               row_number() OVER (PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC) AS rn
+        FROM checkpoints WHERE thread_id = :thread_id
+    ) old
+    WHERE c.thread_id = :thread_id AND c.checkpoint_ns = old.checkpoint_ns
+      AND c.checkpoint_id = old.checkpoint_id AND old.rn > :keep
+    RETURNING c.checkpoint_ns, c.checkpoint_id, c.checkpoint -> 'channel_versions' AS versions
+""")
+
+DELETE_WRITES=text("""
+    DELETE FROM checkpoint_writes w
+    USING jsonb_to_recordset(CAST(:deleted AS jsonb)) AS d(checkpoint_ns text, checkpoint_id text)
+    WHERE w.thread_id = :thread_id AND w.checkpoint_ns = d.checkpoint_ns AND w.checkpoint_id = d.checkpoint_id
+""")
+
+# Only versions the deleted checkpoints referenced: the saver writes a new checkpoint's
+# blobs before its row, so "unreferenced" alone would include those.
+# Runs after DELETE_OLD_CHECKPOINTS in the same transaction, so NOT EXISTS only sees the kept checkpoints.
+DELETE_RELEASED_BLOBS=text("""
+    DELETE FROM checkpoint_blobs b
+    USING jsonb_to_recordset(CAST(:released AS jsonb)) AS r(checkpoint_ns text, channel text, version text)
+    WHERE b.thread_id = :thread_id AND b.checkpoint_ns = r.checkpoint_ns
+      AND b.channel = r.channel AND b.version = r.version
+      AND NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+          AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version
+      )
+""")
+
+PURGE_PREFIX=[
+    text("DELETE FROM checkpoint_writes WHERE starts_with(thread_id, :prefix)"),
+    text("DELETE FROM checkpoint_blobs WHERE starts_with(thread_id, :prefix)"),
+    text("DELETE FROM checkpoints WHERE starts_with(thread_id, :prefix)"),
+]
+
+THREAD_SIZES="""
+    SELECT thread_id, sum(checkpoints) AS checkpoints, coalesce(sum(bytes), 0) AS bytes FROM (
+        SELECT thread_id, count(*) AS checkpoints, sum(pg_column_size(checkpoint) + pg_column_size(metadata)) AS bytes
+        FROM checkpoints GROUP BY thread_id
+        UNION ALL
+        SELECT thread_id, 0, sum(pg_column_size(blob)) FROM checkpoint_blobs GROUP BY thread_id
+        UNION ALL
+        SELECT thread_id, 0, sum(pg_column_size(blob)) FROM checkpoint_writes GROUP BY thread_id
+    ) sizes
+    GROUP BY thread_id
+"""
+
+LARGEST_THREADS=text(THREAD_SIZES+" ORDER BY bytes DESC LIMIT :top")
+
+STORAGE_TOTALS=text(f"""
+    SELECT count(*) AS threads, coalesce(sum(checkpoints), 0) AS checkpoints, coalesce(sum(bytes), 0) AS bytes
+    FROM ({THREAD_SIZES}) threads
+""")
+
+def released_versions(rows:Iterable)->List[dict]:
+    """(namespace, channel, version) of every blob the deleted checkpoint `rows` referenced."""
+    released={(row.checkpoint_ns,channel,str(version)) for row in rows for channel,version in (row.versions or {}).items()}
+    return [{"checkpoint_ns":ns,"channel":channel,"version":version} for ns,channel,version in sorted(released)]
+
+def compact_thread(thread_id:str,keep:int=CHECKPOINT_KEEP_LAST)->Dict[str,int]:
+    with engine.begin() as conn:
+        rows=conn.execute(DELETE_OLD_CHECKPOINTS,{"thread_id":thread_id,"keep":keep}).fetchall()
+        deleted={"checkpoints":len(rows),"writes":0,"blobs":0}
+        if rows:
+            ids=[{"checkpoint_ns":row.checkpoint_ns,"checkpoint_id":row.checkpoint_id} for row in rows]
+            deleted["writes"]=conn.execute(DELETE_WRITES,{"thread_id":thread_id,"deleted":json.dumps(ids)}).rowcount
+            deleted["blobs"]=conn.execute(DELETE_RELEASED_BLOBS,{"thread_id":thread_id,"released":json.dumps(released_versions(rows))}).rowcount
+    for table,count in deleted.items():
+        metrics.incr(f"checkpoints.deleted_{table}",count)
+    return deleted
+
+def purge_prefix(prefix:str)->int:
+    with engine.begin() as conn:
+        counts=[conn.execute(statement,{"prefix":prefix}).rowcount for statement in PURGE_PREFIX]
+    metrics.incr("checkpoints.purged_checkpoints",counts[-1])
+    return counts[-1]
+
+def compact(keep:int=CHECKPOINT_KEEP_LAST,batch:int=CHECKPOINT_COMPACT_BATCH)->Dict[str,int]:
+    """Trim up to `batch` threads to their last `keep` checkpoints."""
+    totals={"threads":0,"checkpoints":0,"writes":0,"blobs":0,"purged":0}
+    for prefix in CHECKPOINT_PURGE_PREFIXES:
+        totals["purged"]+=purge_prefix(prefix)
+    with engine.connect() as conn:
+        thread_ids={row.thread_id for row in conn.execute(OVERGROWN_THREADS,{"keep":keep,"limit":batch})}
+    for thread_id in thread_ids:
+        for table,count in compact_thread(thread_id,keep).items():
+            totals[table]+=count
+        totals["threads"]+=1
+    return totals
+
+def thread_hash(thread_id:str)->str:
+    return hashlib.sha256(thread_id.encode()).hexdigest()[:16]
+
+def largest_threads(top:int=CHECKPOINT_STATS_TOP)->List[dict]:
+    with engine.connect() as conn:
+        rows=conn.execute(LARGEST_THREADS,{"top":top}).fetchall()
+    return [{"thread":thread_hash(row.thread_id),"checkpoints":int(row.checkpoints),"bytes":int(row.bytes)} for row in rows]
+
+_stats={"at":0.0,"value":{}}
+
+def storage_stats()->dict:
+    """Per-thread checkpoint storage, recomputed at most every CHECKPOINT_STATS_TTL seconds."""
+    if time.monotonic()-_stats["at"]>CHECKPOINT_STATS_TTL:
+        try:
+            with engine.connect() as conn:
+                totals=conn.execute(STORAGE_TOTALS).one()
+            _stats["value"]={"threads":int(totals.threads),"checkpoints":int(totals.checkpoints),"bytes":int(totals.bytes),"largest_threads":largest_threads()}
+        except Exception as e:
+            _stats["value"]={"error":str(e)}
+        _stats["at"]=time.monotonic()
+    return _stats["value"]
+
+def ensure_compaction_scheduled():
+    """Queue the compaction job unless one is already queued or running."""
+    db=SessionLocal()
+    try:
+        xact_lock(db,COMPACT_JOB)
+        pending=db.query(Job).filter(Job.kind==COMPACT_JOB,Job.status.in_(["queued","running"])).first()
+        if pending is None:
+            jobs.enqueue(db,COMPACT_JOB,{"keep":CHECKPOINT_KEEP_LAST},commit=False)
+        db.commit()
+    finally:
+        db.close()
+
+def schedule_next_compaction():
+    """Queue the next run in CHECKPOINT_COMPACT_INTERVAL, unless a run is already queued (e.g. a retry)."""
+    db=SessionLocal()
+    try:
+        xact_lock(db,COMPACT_JOB)
+        queued=db.query(Job).filter(Job.kind==COMPACT_JOB,Job.status=="queued").first()
+        if queued is None:
+            jobs.enqueue(db,COMPACT_JOB,{"keep":CHECKPOINT_KEEP_LAST},run_at=jobs.utcnow()+timedelta(seconds=CHECKPOINT_COMPACT_INTERVAL),commit=False)
+        db.commit()
+    finally:
+        db.close()
+
+metrics.register_collector("checkpoints",storage_stats)
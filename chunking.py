@@ -0,0 +1,71 @@
+# Packs whole utterances into chunks of up to CHUNK_MAX_TOKENS, splitting only
+# an utterance that is too long on its own (at sentence boundaries).
+import os
+import re
+from typing import Dict,List
+
+from langchain_core.documents import Document
+
+from models import TranscriptSegment
+from tokens import CHARS_PER_TOKEN,approx_tokens
+from transcripts import caption_line
+
+CHUNK_MAX_TOKENS=int(os.environ.get('CHUNK_MAX_TOKENS',400))
+# Utterances repeated at the start of the next chunk, for context.
+CHUNK_OVERLAP_UTTERANCES=int(os.environ.get('CHUNK_OVERLAP_UTTERANCES',0))
+
+SENTENCE_END=re.compile(r"(?<=[.!?])\s+")
+
+def split_long(segment:TranscriptSegment,max_tokens:int)->List[TranscriptSegment]:
+    """Split an utterance over the budget into sentence groups that fit."""
+    if approx_tokens(caption_line(segment))<=max_tokens:
+        return [segment]
+    limit=max_tokens*CHARS_PER_TOKEN-len(segment.speaker_name)-5
+    pieces,current=[],""
+    for sentence in SENTENCE_END.split(segment.transcription.strip()):
+        while len(sentence)>limit:
+            if current:
+                pieces.append(current)
+                current=""
+            pieces.append(sentence[:limit])
+            sentence=sentence[limit:]
+        if current and len(current)+1+len(sentence)>limit:
+            pieces.append(current)
+            current=sentence
+        else:
+            current=f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return [segment.model_copy(update={"transcription":piece}) for piece in pieces]
+
+def make_chunk(segments:List[TranscriptSegment],metadata:Dict)->Document:
+    speakers=list(dict.fromkeys(segment.speaker_name for segment in segments))
+    return Document(
+        page_content="".join(caption_line(segment) for segment in segments),
+        metadata={
+            **metadata,
+            "speakers":speakers,
+            "start_ms":segments[0].timestamp_ms,
+            "end_ms":max(segment.timestamp_ms+segment.duration_ms for segment in segments),
+        },
+    )
+
+def chunk_segments(segments:List[TranscriptSegment],metadata:Dict,max_tokens:int=CHUNK_MAX_TOKENS,overlap:int=CHUNK_OVERLAP_UTTERANCES)->List[Document]:
+    chunks:List[Document]=[]
+    current:List[TranscriptSegment]=[]
+    size=0
+    for segment in segments:
+        for piece in split_long(segment,max_tokens):
+            piece_tokens=approx_tokens(caption_line(piece))
+            if current and size+piece_tokens>max_tokens:
+                chunks.append(make_chunk(current,metadata))
+                current=current[-overlap:] if overlap else []
+                size=sum(approx_tokens(caption_line(s)) for s in current)
+                # the carried-over context must leave room for new text
+                while current and size+piece_tokens>max_tokens:
+                    size-=approx_tokens(caption_line(current.pop(0)))
+            current.append(piece)
+            size+=piece_tokens
+    if current:
+        chunks.append(make_chunk(current,metadata))
+    return chunks
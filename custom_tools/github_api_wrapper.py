@@ -44,6 +44,13 @@ class GitHubAPIWrapper(BaseModel):
     @classmethod
     def validate_environment(cls, values: Dict) -> Any:
         """Validate that api key and python package exists in environment."""
+        if values.get("github_repo_instance") is not None:
+            # Already connected (see from_registry), skip the GitHub bootstrap.
+            repo = values["github_repo_instance"]
+            values.setdefault("github_base_branch", repo.default_branch)
+            values.setdefault("active_branch", repo.default_branch)
+            return values
+
         github_repository = get_from_dict_or_env(
             values, "github_repository", "GITHUB_REPOSITORY"
         )
@@ -119,6 +126,26 @@ class GitHubAPIWrapper(BaseModel):
 
         return values
 
+    @classmethod
+    def from_registry(cls, github_repository: str) -> "GitHubAPIWrapper":
+        """Create a wrapper on the shared, already-authenticated repo handle.
+
+        Parameters:
+            github_repository(str): The repository full name, e.g. `owner/repo`
+        Returns:
+            GitHubAPIWrapper: A wrapper with its own active branch state
+        """
+        from custom_tools.github_registry import get_github_registry
+
+        registry = get_github_registry()
+        entry = registry.get(github_repository)
+        return cls(
+            github=entry.github,
+            github_repo_instance=entry.repo,
+            github_repository=github_repository,
+            github_app_id=registry.github_app_id,
+        )
+
     def parse_issues(self, issues: List[Issue]) -> List[dict]:
         """
         Extracts title and number from each Issue and puts them in a dictionary
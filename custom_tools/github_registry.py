@@ -0,0 +1,151 @@
+"""Process-wide GitHub App installation clients, keyed by repository."""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from github import Auth, Github, GithubException, GithubIntegration
+
+import metrics
+
+# Installation tokens live for an hour; mint a new one this long before expiry.
+GITHUB_TOKEN_REFRESH_MARGIN = timedelta(
+    seconds=int(os.environ.get("GITHUB_TOKEN_REFRESH_MARGIN", 300))
+)
+
+
+class InstallationTokenAuth(Auth.Auth):
+    """PyGithub auth that mints installation tokens and refreshes them early.
+
+    PyGithub's own AppInstallationAuth only refreshes 20 seconds before expiry,
+    on the request that notices it; this one refreshes GITHUB_TOKEN_REFRESH_MARGIN
+    ahead and can be refreshed explicitly by the registry.
+    """
+
+    def __init__(self, integration: GithubIntegration, installation_id: int):
+        self.integration = integration
+        self.installation_id = installation_id
+        self._authorization: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def token_type(self) -> str:
+        return "token"
+
+    @property
+    def token(self) -> str:
+        if self.expires_soon():
+            self.refresh()
+        return self._authorization.token
+
+    @property
+    def expires_at(self) -> Optional[datetime]:
+        return self._authorization.expires_at if self._authorization else None
+
+    def expires_soon(self) -> bool:
+        expires_at = self.expires_at
+        return (
+            expires_at is None
+            or expires_at - GITHUB_TOKEN_REFRESH_MARGIN < datetime.now(timezone.utc)
+        )
+
+    def refresh(self, force: bool = False) -> None:
+        with self._lock:
+            if force or self.expires_soon():
+                self._authorization = self.integration.get_access_token(
+                    self.installation_id
+                )
+                metrics.incr("github_registry.token_refreshes")
+
+    @property
+    def _masked_token(self) -> str:
+        return "token (oauth token removed)"
+
+
+@dataclass
+class RepositoryEntry:
+    github: Github
+    repo: Any
+    auth: InstallationTokenAuth
+
+
+class GitHubAppRegistry:
+    """Keeps one ready `Repository` handle per repository for the process.
+
+    The first `get` for a repository does the installation lookup, token mint
+    and repo fetch; later calls return the cached handle and only hit GitHub
+    when the installation token is about to expire.
+    """
+
+    def __init__(self, github_app_id: str, github_app_private_key: str):
+        self.github_app_id = github_app_id
+        self.integration = GithubIntegration(
+            auth=Auth.AppAuth(github_app_id, github_app_private_key)
+        )
+        self.entries: Dict[str, RepositoryEntry] = {}
+        self.locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        metrics.register_collector("github_registry", self.stats)
+
+    def get(self, github_repository: str) -> RepositoryEntry:
+        entry = self.entries.get(github_repository)
+        if entry is None:
+            with self.locks[github_repository]:
+                entry = self.entries.get(github_repository)
+                if entry is None:
+                    with metrics.timer("github_registry.cold_ms"):
+                        entry = self._connect(github_repository)
+                    self.entries[github_repository] = entry
+                    return entry
+        with metrics.timer("github_registry.warm_ms"):
+            if entry.auth.expires_soon():
+                entry.auth.refresh()
+        return entry
+
+    def _connect(self, github_repository: str) -> RepositoryEntry:
+        owner, name = github_repository.split("/", 1)
+        try:
+            installation = self.integration.get_repo_installation(owner, name)
+        except GithubException as e:
+            raise ValueError(
+                f"Please make sure to install the created github app with id "
+                f"{self.github_app_id} on the repo: {github_repository} "
+                f"Error message: {e}"
+            )
+        auth = InstallationTokenAuth(self.integration, installation.id)
+        auth.refresh()
+        client = Github(auth=auth)
+        repo = client.get_repo(github_repository)
+        return RepositoryEntry(github=client, repo=repo, auth=auth)
+
+    def invalidate(self, github_repository: str) -> None:
+        """Forget a repository, e.g. after the app was uninstalled from it."""
+        self.entries.pop(github_repository, None)
+
+    def stats(self) -> dict:
+        return {
+            "repositories": len(self.entries),
+            "tokens_expiring_soon": sum(
+                1 for entry in list(self.entries.values()) if entry.auth.expires_soon()
+            ),
+        }
+
+
+_registry: Optional[GitHubAppRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_github_registry() -> GitHubAppRegistry:
+    """Return the process registry, reading the app key file once."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                with open(os.environ["GITHUB_APP_PRIVATE_FILE"]) as f:
+                    private_key = f.read()
+                _registry = GitHubAppRegistry(os.environ["GITHUB_APP_ID"], private_key)
+    return _registry
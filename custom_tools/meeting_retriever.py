@@ -1,4 +1,4 @@
-from utils import pinecone_check_index,pc,embeddings
+from utils import pinecone_check_index,get_pinecone,get_embeddings
 import os
 from typing import Optional
 from database import SessionLocal
@@ -37,27 +37,34 @@ def list_user_meetings(user_id:str,project_id:str) -> list[Meeting]:
 class RetrieveOrListMeetingsInput(BaseModel):
     query: str
     meeting_id: Optional[str] = None
+    speaker: Optional[str] = None
 
 
 @tool(
     description=(
-        "If you give me a `query` and a `meeting_id`, I'll return transcript snippets.  "
+        "If you give me a `query` and a `meeting_id`, I'll return transcript snippets, "
+        "add `speaker` (their name as shown in the transcript) to only get what that person said.  "
         "If you only give me a `query`, I'll look for an attendee name or date and "
         "list matching meetings (showing Meeting ID, Link, Created, Ended, Attendees)."
     ),
     args_schema=RetrieveOrListMeetingsInput,
 )
-def retrieve_or_list_meetings(query: str,config:RunnableConfig, meeting_id: Optional[str] = None)-> str:
+def retrieve_or_list_meetings(query: str,config:RunnableConfig, meeting_id: Optional[str] = None, speaker: Optional[str] = None)-> str:
+    pc=get_pinecone()
     pinecone_check_index(pc)
     index = pc.Index(os.environ['PINECONE_VECTOR_NAME'])
     # 1) If they gave us a meeting_id, do the Pinecone transcript lookup:
     if meeting_id:
-        q_emb = embeddings.embed_query(query)
+        q_emb = get_embeddings().embed_query(query)
+        query_filter={ "meeting_id": { "$eq": meeting_id } }
+        if speaker:
+            # chunks indexed from transcript segments list their speakers
+            query_filter["speakers"]={ "$in": [speaker] }
         res = index.query(
             vector=q_emb,
             top_k=5,
             include_metadata=True,
-            filter={ "meeting_id": { "$eq": meeting_id } }
+            filter=query_filter
         )
         if not res["matches"]:
             return f"No transcript found for meeting `{meeting_id}`."
@@ -0,0 +1,76 @@
+# psycopg pools shared by the LangGraph saver and store, reported under
+# `db_pools` in /metrics together with the SQLAlchemy engine pool.
+import os
+from typing import Dict,Union
+
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool,ConnectionPool
+
+import metrics
+from database import engine
+
+CHECKPOINT_POOL_MIN_SIZE=int(os.environ.get('CHECKPOINT_POOL_MIN_SIZE',2))
+CHECKPOINT_POOL_MAX_SIZE=int(os.environ.get('CHECKPOINT_POOL_MAX_SIZE',10))
+# Seconds a request waits for a free connection before failing.
+CHECKPOINT_POOL_TIMEOUT=float(os.environ.get('CHECKPOINT_POOL_TIMEOUT',30))
+
+# What the savers' from_conn_string uses for its single connection.
+CONNECTION_KWARGS={"autocommit":True,"prepare_threshold":0,"row_factory":dict_row}
+
+_pools:Dict[str,Union[ConnectionPool,AsyncConnectionPool]]={}
+
+def pool_options(name:str)->dict:
+    return dict(
+        conninfo=os.environ['DATABASE_URI'],
+        min_size=CHECKPOINT_POOL_MIN_SIZE,
+        max_size=CHECKPOINT_POOL_MAX_SIZE,
+        timeout=CHECKPOINT_POOL_TIMEOUT,
+        kwargs=CONNECTION_KWARGS,
+        name=name,
+        open=False,
+    )
+
+def open_pool(name:str)->ConnectionPool:
+    pool=ConnectionPool(**pool_options(name))
+    pool.open()
+    _pools[name]=pool
+    return pool
+
+async def open_async_pool(name:str)->AsyncConnectionPool:
+    pool=AsyncConnectionPool(**pool_options(name))
+    await pool.open()
+    _pools[name]=pool
+    return pool
+
+def forget_pool(name:str):
+    _pools.pop(name,None)
+
+def pool_stats(pool:Union[ConnectionPool,AsyncConnectionPool])->dict:
+    stats=pool.get_stats()
+    size=stats.get("pool_size",0)
+    in_use=size-stats.get("pool_available",0)
+    requests=stats.get("requests_num",0)
+    return {
+        "size":size,
+        "max_size":pool.max_size,
+        "in_use":in_use,
+        "utilization":in_use/pool.max_size if pool.max_size else 0.0,
+        "waiting":stats.get("requests_waiting",0),
+        "requests":requests,
+        "avg_wait_ms":stats.get("requests_wait_ms",0)/requests if requests else 0.0,
+        "timeouts":stats.get("requests_errors",0),
+        "connection_errors":stats.get("connections_errors",0),
+    }
+
+def engine_pool_stats()->dict:
+    pool=engine.pool
+    if not hasattr(pool,"checkedout"):
+        return {"status":pool.status()}
+    return {"size":pool.size(),"in_use":pool.checkedout(),"overflow":pool.overflow(),"utilization":pool.checkedout()/pool.size() if pool.size() else 0.0}
+
+def collect()->dict:
+    stats={name:pool_stats(pool) for name,pool in _pools.items()}
+    stats["sqlalchemy"]=engine_pool_stats()
+    return stats
+
+metrics.register_collector("db_pools",collect)
@@ -1,32 +1,95 @@
-from langgraph.prebuilt import ToolNode
 from langgraph.graph import StateGraph, START, END,MessagesState
 from langchain_core.runnables.config import RunnableConfig
 from langgraph.store.base import BaseStore
-from llm import llm
-from tools import tools
+from llm import Llm,llm_for,record_usage,router,turn_features
+from langchain_core.messages import SystemMessage
+from tools import get_tools,TOOL_INTEGRATIONS
+from tool_node import BoundedToolNode
+from tool_cache import tool_results
+from tool_budget import budget_tool_results,abudget_tool_results
 from typing import TypedDict
+from history import AgentState,plan_window,summary_request,with_summary
 from datetime import datetime,timezone
 from models import ApiKeys,Project
 from langgraph.store.postgres import PostgresStore
-from langgraph.checkpoint.postgres import PostgresSaver
-import os
-from contextlib import ExitStack
+from langgraph.store.postgres.aio import AsyncPostgresStore
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from langgraph.utils.runnable import RunnableCallable
+from db_pools import open_pool,open_async_pool,forget_pool
+import threading
+import metrics
+from contextlib import ExitStack,AsyncExitStack
 
-# store=InMemorySaver()
+# Nothing connects at import time: the ephemeral graph (used by the worker)
+# is opened on first use by get_ephemeral_graph, the async one by the app
+# lifespan.
 _exit_stack = ExitStack()
-store= _exit_stack.enter_context(PostgresStore.from_conn_string(os.environ['DATABASE_URI']))
-checkpointer =_exit_stack.enter_context(PostgresSaver.from_conn_string(os.environ['DATABASE_URI']))
+_graph_lock = threading.Lock()
+ephemeral_graph = None
 
-# store.setup()
-# checkpointer.setup()
-def call_model(state: MessagesState,config:RunnableConfig,*,store: BaseStore):
+# The async store/checkpointer need a running event loop, so they are opened
+# from the app lifespan (see open_async_graph) instead of at import time.
+_async_exit_stack = AsyncExitStack()
+async_graph = None
+
+def get_system_message(config:RunnableConfig):
     configurable=config.get('configurable')
     if configurable:
-        system_message=configurable.get('system_message')
-    else:
-        system_message=""
-    response = llm.invoke({"messages": state["messages"],"system_message":system_message})
-    return {"messages": [response]}
+        return configurable.get('system_message')
+    return ""
+
+def get_system_context(config:RunnableConfig):
+    configurable=config.get('configurable') or {}
+    context=configurable.get('system_context')
+    if context is None and configurable.get('project') is not None:
+        # built per turn, so the current time stays current in long sessions
+        context=generate_context(configurable.get('__api_keys'),configurable['project'])
+    return [SystemMessage(context)] if context else []
+
+def get_api_keys(config:RunnableConfig):
+    return (config.get('configurable') or {}).get('__api_keys')
+
+def route_turn(messages,config:RunnableConfig):
+    request_type=(config.get('configurable') or {}).get('request_type','chat')
+    return router.route(turn_features(messages,request_type))
+
+# Summaries are internal, keep their tokens out of the websocket stream.
+summarizer=Llm.with_config(tags=["nostream"],run_name="history_summary")
+result_summarizer=Llm.with_config(tags=["nostream"],run_name="tool_result_summary")
+
+def budget_results(state: AgentState,config:RunnableConfig):
+    return budget_tool_results(state,result_summarizer)
+
+async def abudget_results(state: AgentState,config:RunnableConfig):
+    return await abudget_tool_results(state,result_summarizer)
+
+def call_model(state: AgentState,config:RunnableConfig,*,store: BaseStore):
+    window=plan_window(state["messages"],state.get("summarized_until"))
+    summary=state.get("summary")
+    update={}
+    if window.to_fold:
+        summary=summarizer.invoke(summary_request(summary,window.to_fold)).content
+        update={"summary":summary,"summarized_until":window.to_fold[-1].id}
+    messages=with_summary(summary,window.messages)
+    route=route_turn(messages,config)
+    with metrics.timer(f"llm.route.{route}_ms"):
+        response = llm_for(get_api_keys(config),router.model(route)).invoke({"messages": messages,"system_message":get_system_message(config),"context":get_system_context(config)})
+    record_usage(response,route)
+    return {"messages": [response],**update}
+
+async def acall_model(state: AgentState,config:RunnableConfig,*,store: BaseStore):
+    window=plan_window(state["messages"],state.get("summarized_until"))
+    summary=state.get("summary")
+    update={}
+    if window.to_fold:
+        summary=(await summarizer.ainvoke(summary_request(summary,window.to_fold))).content
+        update={"summary":summary,"summarized_until":window.to_fold[-1].id}
+    messages=with_summary(summary,window.messages)
+    route=route_turn(messages,config)
+    with metrics.timer(f"llm.route.{route}_ms"):
+        response = await llm_for(get_api_keys(config),router.model(route)).ainvoke({"messages": messages,"system_message":get_system_message(config),"context":get_system_context(config)})
+    record_usage(response,route)
+    return {"messages": [response],**update}
 
 def should_continue(state: MessagesState):
     messages = state["messages"]
@@ -39,18 +102,76 @@ class ConfigSchema(TypedDict):
     thread_id: str
     api_keys: ApiKeys
 
-workflow = StateGraph(MessagesState,ConfigSchema)
-tool_node = ToolNode(tools)
-workflow.add_node("agent", call_model)
-workflow.add_node("tools", tool_node)
+_workflow = None
+
+def get_workflow():
+    global _workflow
+    if _workflow is None:
+        workflow = StateGraph(AgentState,ConfigSchema)
+        tool_node = BoundedToolNode(get_tools(),integrations=TOOL_INTEGRATIONS,cache=tool_results)
+        workflow.add_node("agent", RunnableCallable(call_model,acall_model))
+        workflow.add_node("tools", tool_node)
+        # Oversized tool results are cut down before the model sees them.
+        workflow.add_node("budget", RunnableCallable(budget_results,abudget_results))
 
-workflow.add_edge(START, "agent")
-workflow.add_conditional_edges("agent", should_continue, ["tools", END])
-workflow.add_edge("tools", "agent")
-graph =workflow.compile(checkpointer=checkpointer,store=store)
+        workflow.add_edge(START, "agent")
+        workflow.add_conditional_edges("agent", should_continue, ["tools", END])
+        workflow.add_edge("tools", "budget")
+        workflow.add_edge("budget", "agent")
+        _workflow = workflow
+    return _workflow
 
-def generate_system(api_keys:ApiKeys,project:Project):
-    return f"""Currently it's {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')}\nYou are SyncWise-AI for the project {project.name} which has description: {project.description}, an expert assistant embedded in a LangGraph workflow.
+def open_graph():
+    """Compile the ephemeral graph against a pooled Postgres store.
+
+    Internal one-shot runs (meeting ingestion) use it: nothing is
+    checkpointed and no thread_id is needed.
+    """
+    global ephemeral_graph
+    with _graph_lock:
+        if ephemeral_graph is None:
+            pool=_exit_stack.enter_context(open_pool("checkpoint"))
+            _exit_stack.callback(forget_pool,"checkpoint")
+            ephemeral_graph=get_workflow().compile(store=PostgresStore(pool))
+    return ephemeral_graph
+
+def get_ephemeral_graph():
+    return ephemeral_graph if ephemeral_graph is not None else open_graph()
+
+def close_graph():
+    global ephemeral_graph
+    with _graph_lock:
+        ephemeral_graph=None
+        _exit_stack.close()
+
+async def open_async_graph():
+    """Compile the graph against the async Postgres store/checkpointer.
+
+    Must be awaited inside the running event loop that will call `astream`.
+    """
+    global async_graph
+    apool=await _async_exit_stack.enter_async_context(await open_async_pool("checkpoint_async"))
+    _async_exit_stack.callback(forget_pool,"checkpoint_async")
+    astore=AsyncPostgresStore(apool)
+    acheckpointer=AsyncPostgresSaver(apool)
+    async_graph=get_workflow().compile(checkpointer=acheckpointer,store=astore)
+    return async_graph
+
+async def close_async_graph():
+    global async_graph
+    async_graph=None
+    await _async_exit_stack.aclose()
+
+def get_async_graph():
+    if async_graph is None:
+        raise RuntimeError("Async graph is not initialized, call open_async_graph() first")
+    return async_graph
+
+# Static part of the chat system prompt. It is identical for every user and
+# request so, together with the (sorted) tool schemas, it forms a prefix the
+# provider can cache. Anything that changes per project or per request goes
+# into generate_context, which is sent after the conversation.
+SYSTEM_PROMPT = """You are SyncWise-AI, an expert assistant for a software project, embedded in a LangGraph workflow.
     Behavior:
         When the user requests or implies an action in Jira, GitHub, Slack, list meetings, query meeting captions, or Google Calendar, automatically invoke the corresponding toolkit.
 
@@ -66,6 +187,12 @@ def generate_system(api_keys:ApiKeys,project:Project):
 
         When writing code or file contents, use markdown code blocks with triple backticks and specify the language or file format immediately after the opening backticks (e.g., ```html).
 
+    The current time, the project and its configuration are given in the last system message.
+        """
+
+def generate_context(api_keys:ApiKeys,project:Project):
+    return f"""Currently it's {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')}
+    Project: {project.name} which has description: {project.description}
     Some configurations:
         Jira Project key: `{api_keys.JIRA_PROJECT}`
         """
@@ -0,0 +1,97 @@
+# What the agent sends the model: a summary of older turns plus the last
+# HISTORY_KEEP_TURNS turns once history grows past HISTORY_MAX_TOKENS.
+import os
+from typing import List,NamedTuple,Optional
+
+from langchain_core.messages import BaseMessage,HumanMessage,SystemMessage,ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.graph import MessagesState
+
+import metrics
+
+HISTORY_MAX_TOKENS=int(os.environ.get('HISTORY_MAX_TOKENS',12000))
+HISTORY_KEEP_TURNS=int(os.environ.get('HISTORY_KEEP_TURNS',4))
+HISTORY_TOOL_PAYLOAD_CHARS=int(os.environ.get('HISTORY_TOOL_PAYLOAD_CHARS',2000))
+
+SUMMARY_PROMPT="""You maintain a running summary of a conversation between a user and SyncWise-AI.
+Update the summary with the new messages below. Keep facts, decisions, identifiers (issue keys, PR numbers, branch names, channel ids, event ids, meeting ids) and open questions. Drop pleasantries and raw tool dumps. Reply with the updated summary only.
+
+Current summary:
+{summary}
+
+New messages:
+{transcript}
+"""
+
+class AgentState(MessagesState):
+    summary:Optional[str]
+    summarized_until:Optional[str]
+
+class HistoryWindow(NamedTuple):
+    messages:List[BaseMessage]
+    to_fold:List[BaseMessage]
+
+def split_turns(messages:List[BaseMessage])->List[List[BaseMessage]]:
+    """Group messages into turns, each starting at a human message."""
+    turns:List[List[BaseMessage]]=[]
+    for message in messages:
+        if isinstance(message,HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+def condense_tool_payloads(messages:List[BaseMessage],limit:int=HISTORY_TOOL_PAYLOAD_CHARS)->List[BaseMessage]:
+    condensed=[]
+    for message in messages:
+        if isinstance(message,ToolMessage) and isinstance(message.content,str) and len(message.content)>limit:
+            dropped=len(message.content)-limit
+            message=message.model_copy(update={"content":f"{message.content[:limit]}\n[... {dropped} more characters of an earlier tool result omitted]"})
+            metrics.incr("history.tool_payloads_condensed")
+        condensed.append(message)
+    return condensed
+
+def plan_window(messages:List[BaseMessage],summarized_until:Optional[str]=None)->HistoryWindow:
+    """Split the history into what the model sees and what should be folded into the summary."""
+    start=0
+    if summarized_until is not None:
+        for i,message in enumerate(messages):
+            if message.id==summarized_until:
+                start=i+1
+                break
+    turns=split_turns(messages[start:])
+    turns=[condense_tool_payloads(turn) for turn in turns[:-1]]+turns[-1:]
+
+    to_fold:List[BaseMessage]=[]
+    if len(turns)>HISTORY_KEEP_TURNS and count_tokens_approximately(m for turn in turns for m in turn)>HISTORY_MAX_TOKENS:
+        to_fold=[m for turn in turns[:-HISTORY_KEEP_TURNS] for m in turn]
+        turns=turns[-HISTORY_KEEP_TURNS:]
+    kept=[m for turn in turns for m in turn]
+
+    before=count_tokens_approximately(messages)
+    after=count_tokens_approximately(kept)
+    metrics.incr("history.prompt_tokens_full",before)
+    metrics.incr("history.prompt_tokens_sent",after)
+    metrics.observe("history.tokens_saved",before-after)
+    return HistoryWindow(kept,to_fold)
+
+def render_transcript(messages:List[BaseMessage])->str:
+    lines=[]
+    for message in messages:
+        content=message.content if isinstance(message.content,str) else str(message.content)
+        if isinstance(message,ToolMessage):
+            lines.append(f"tool {message.name}: {content}")
+        else:
+            calls=getattr(message,"tool_calls",None)
+            if calls:
+                content+=" "+", ".join(f"[called {c['name']}({c['args']})]" for c in calls)
+            lines.append(f"{message.type}: {content}")
+    return "\n".join(lines)
+
+def summary_request(summary:Optional[str],to_fold:List[BaseMessage])->str:
+    metrics.incr("history.summaries")
+    return SUMMARY_PROMPT.format(summary=summary or "(empty)",transcript=render_transcript(to_fold))
+
+def with_summary(summary:Optional[str],messages:List[BaseMessage])->List[BaseMessage]:
+    if not summary:
+        return messages
+    return [SystemMessage(f"Summary of the earlier conversation:\n{summary}")]+messages
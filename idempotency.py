@@ -0,0 +1,76 @@
+# Webhook deduplication by idempotency_key (and per bot for DEDUPED_TRANSITIONS),
+# plus the Postgres advisory locks that serialize deliveries and meeting jobs.
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from sqlalchemy import Connection,text
+from sqlalchemy.orm import Session
+
+import metrics
+from database import engine
+from models import WebhookEvent,WebhookPayload
+
+# Only these transitions are deduplicated per bot regardless of the key,
+# repeating them would redo expensive work.
+DEDUPED_TRANSITIONS=("ended",)
+
+def ensure_webhook_table():
+    WebhookEvent.__table__.create(engine,checkfirst=True)
+
+def lock_key(name:str)->int:
+    """Stable signed 64 bit key for pg advisory lock functions."""
+    return int.from_bytes(hashlib.sha256(name.encode()).digest()[:8],"big",signed=True)
+
+def xact_lock(db:Session,name:str):
+    """Block until this transaction holds the lock `name`, released on commit/rollback."""
+    if db.get_bind().dialect.name=="postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"),{"key":lock_key(name)})
+
+def try_session_lock(name:str)->Optional[Connection]:
+    # autocommit, so the connection does not sit idle in a transaction while the lock is held
+    conn=engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+    try:
+        if conn.execute(text("SELECT pg_try_advisory_lock(:key)"),{"key":lock_key(name)}).scalar():
+            return conn
+    except Exception:
+        conn.close()
+        raise
+    conn.close()
+    return None
+
+def release_session_lock(conn:Connection,name:str):
+    try:
+        conn.execute(text("SELECT pg_advisory_unlock(:key)"),{"key":lock_key(name)})
+    finally:
+        conn.close()
+
+@asynccontextmanager
+async def session_lock(name:str):
+    """Try to take the lock `name` for the duration of the block, yields whether it was taken."""
+    if engine.dialect.name!="postgresql":
+        yield True
+        return
+    conn=await asyncio.to_thread(try_session_lock,name)
+    try:
+        yield conn is not None
+    finally:
+        if conn is not None:
+            await asyncio.to_thread(release_session_lock,conn,name)
+
+def lock_webhook(db:Session,payload:WebhookPayload):
+    xact_lock(db,f"webhook:{payload.bot_id}")
+
+def find_replay(db:Session,payload:WebhookPayload)->Optional[dict]:
+    """Return the stored response if this delivery was already processed."""
+    event=db.get(WebhookEvent,payload.idempotency_key)
+    if event is None and payload.data.new_state in DEDUPED_TRANSITIONS:
+        event=db.query(WebhookEvent).filter(WebhookEvent.bot_id==payload.bot_id,WebhookEvent.new_state==payload.data.new_state).first()
+    if event is None:
+        return None
+    metrics.incr("webhook.replays")
+    return event.response
+
+def record_webhook(db:Session,payload:WebhookPayload,response:dict):
+    db.add(WebhookEvent(idempotency_key=payload.idempotency_key,bot_id=payload.bot_id,new_state=payload.data.new_state,response=response))
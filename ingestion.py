@@ -0,0 +1,153 @@
+# Pipelined embedding and Pinecone upsert of meeting chunks. Vector ids are
+# `<meeting_id>#<chunk index>#<text hash>`, so re-indexing only uploads new chunks
+# and embeddings are reused from the EmbeddingCache table.
+import hashlib
+import os
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict,Iterable,List
+
+from langchain_core.documents import Document
+from sqlalchemy.dialects.postgresql import insert
+
+import metrics
+from database import SessionLocal,engine
+from models import EmbeddingCache
+
+INGEST_EMBED_BATCH_SIZE=int(os.environ.get('INGEST_EMBED_BATCH_SIZE',64))
+INGEST_EMBED_CONCURRENCY=int(os.environ.get('INGEST_EMBED_CONCURRENCY',4))
+# PineconeVectorStore keeps the chunk text under this metadata key, and the
+# meeting retriever reads it back from there.
+TEXT_KEY="text"
+
+# Hash lookups per query when reading the embedding cache.
+EMBEDDING_CACHE_LOOKUP_BATCH=int(os.environ.get('EMBEDDING_CACHE_LOOKUP_BATCH',500))
+
+def ensure_embedding_cache_table():
+    EmbeddingCache.__table__.create(engine,checkfirst=True)
+
+def batched(items:list,size:int)->List[list]:
+    return [items[i:i+size] for i in range(0,len(items),size)]
+
+def text_hash(text:str)->str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def chunk_id(meeting_id:str,index:int,text:str)->str:
+    return f"{meeting_id}#{index}#{text_hash(text)[:16]}"
+
+def to_vectors(chunks:List[Document],values:List[List[float]])->List[dict]:
+    return [{"id":chunk.id,"values":vector,"metadata":{**chunk.metadata,TEXT_KEY:chunk.page_content}} for chunk,vector in zip(chunks,values)]
+
+def embedding_model(embeddings)->str:
+    return getattr(embeddings,"model",None) or type(embeddings).__name__
+
+class DatabaseEmbeddingCache:
+    """EmbeddingCache table access; vectors are stored as packed float32."""
+
+    def get_many(self,model:str,hashes:Iterable[str])->Dict[str,List[float]]:
+        found={}
+        db=SessionLocal()
+        try:
+            for batch in batched(list(set(hashes)),EMBEDDING_CACHE_LOOKUP_BATCH):
+                rows=db.query(EmbeddingCache.text_hash,EmbeddingCache.embedding).filter(EmbeddingCache.model==model,EmbeddingCache.text_hash.in_(batch))
+                for row in rows:
+                    found[row.text_hash]=array("f",row.embedding).tolist()
+        finally:
+            db.close()
+        return found
+
+    def put_many(self,model:str,vectors:Dict[str,List[float]]):
+        if not vectors:
+            return
+        rows=[{"model":model,"text_hash":h,"embedding":array("f",v).tobytes()} for h,v in vectors.items()]
+        db=SessionLocal()
+        try:
+            db.execute(insert(EmbeddingCache).values(rows).on_conflict_do_nothing())
+            db.commit()
+        finally:
+            db.close()
+
+class CachedEmbeddings:
+    """Wraps an Embeddings client so only texts missing from `cache` are embedded."""
+
+    def __init__(self,embeddings,cache):
+        self.embeddings=embeddings
+        self.cache=cache
+        self.model=embedding_model(embeddings)
+
+    def embed_documents(self,texts:List[str])->List[List[float]]:
+        hashes=[text_hash(text) for text in texts]
+        found=self.cache.get_many(self.model,hashes)
+        missing=list({h:text for h,text in zip(hashes,texts) if h not in found}.items())
+        metrics.incr("ingest.embedding_cache_hits",len(texts)-len(missing))
+        metrics.incr("ingest.embedding_cache_misses",len(missing))
+        if missing:
+            values=self.embeddings.embed_documents([text for _,text in missing])
+            new={h:vector for (h,_),vector in zip(missing,values)}
+            self.cache.put_many(self.model,new)
+            found.update(new)
+        return [found[h] for h in hashes]
+
+def embed_batch(embeddings,chunks:List[Document])->List[List[float]]:
+    with metrics.timer("ingest.embed_batch_ms"):
+        return embeddings.embed_documents([chunk.page_content for chunk in chunks])
+
+def upsert_batch(index,vectors:List[dict]):
+    with metrics.timer("ingest.upsert_batch_ms"):
+        index.upsert(vectors=vectors)
+
+def assign_ids(meeting_id:str,chunks:List[Document])->List[Document]:
+    for i,chunk in enumerate(chunks):
+        chunk.id=chunk_id(meeting_id,i,chunk.page_content)
+    return chunks
+
+def existing_ids(index,meeting_id:str)->set:
+    return {vector_id for page in index.list(prefix=f"{meeting_id}#") for vector_id in page}
+
+def index_meeting(index,embeddings,meeting_id:str,chunks:List[Document],cache=None)->dict:
+    """Index a meeting's chunks under stable ids, skipping vectors that are already there."""
+    assign_ids(meeting_id,chunks)
+    try:
+        existing=existing_ids(index,meeting_id)
+    except Exception as e:
+        # pod-based indexes cannot list ids: upsert everything, leftovers are only overwritten
+        print("Could not list meeting vectors: ",e)
+        existing=set()
+    current={chunk.id for chunk in chunks}
+    pending=[chunk for chunk in chunks if chunk.id not in existing]
+    embeddings=CachedEmbeddings(embeddings,cache if cache is not None else DatabaseEmbeddingCache())
+    stats=index_chunks(index,embeddings,pending)
+    stale=[vector_id for vector_id in existing if vector_id not in current]
+    for batch in batched(stale,1000):
+        index.delete(ids=batch)
+    metrics.incr("ingest.vectors_unchanged",len(chunks)-len(pending))
+    metrics.incr("ingest.stale_vectors_deleted",len(stale))
+    stats.update(unchanged=len(chunks)-len(pending),stale_deleted=len(stale))
+    return stats
+
+def index_chunks(index,embeddings,chunks:List[Document],batch_size:int=INGEST_EMBED_BATCH_SIZE,concurrency:int=INGEST_EMBED_CONCURRENCY)->dict:
+    """Embed and upsert `chunks` (which must have ids), returns counts and throughput."""
+    start=time.perf_counter()
+    batches=batched(chunks,batch_size)
+    with ThreadPoolExecutor(max_workers=concurrency,thread_name_prefix="embed") as embedder, \
+            ThreadPoolExecutor(max_workers=1,thread_name_prefix="upsert") as uploader:
+        embedding=deque()
+        uploads=[]
+        for batch in batches:
+            # keep at most `concurrency` batches embedding ahead of the uploads
+            if len(embedding)>=concurrency:
+                done,values=embedding.popleft()
+                uploads.append(uploader.submit(upsert_batch,index,to_vectors(done,values.result())))
+            embedding.append((batch,embedder.submit(embed_batch,embeddings,batch)))
+        while embedding:
+            done,values=embedding.popleft()
+            uploads.append(uploader.submit(upsert_batch,index,to_vectors(done,values.result())))
+        for upload in uploads:
+            upload.result()
+    seconds=time.perf_counter()-start
+    stats={"chunks":len(chunks),"batches":len(batches),"seconds":seconds,"chunks_per_sec":len(chunks)/seconds if seconds else 0.0}
+    metrics.incr("ingest.chunks",len(chunks))
+    metrics.observe("ingest.chunks_per_sec",stats["chunks_per_sec"])
+    return stats
@@ -0,0 +1,131 @@
+# Durable job queue on the Job table: workers claim rows with FOR UPDATE SKIP
+# LOCKED and hold a renewable lease; a job whose lease ran out is claimed again.
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime,timedelta,timezone
+from typing import Any,Dict,Iterable,Optional
+
+from sqlalchemy import and_,or_,update
+from sqlalchemy.orm import Session
+
+import metrics
+from database import SessionLocal,engine
+from models import Job
+
+# Seconds a claimed job stays invisible to other workers without a heartbeat.
+JOB_VISIBILITY_TIMEOUT=int(os.environ.get('JOB_VISIBILITY_TIMEOUT',900))
+JOB_MAX_ATTEMPTS=int(os.environ.get('JOB_MAX_ATTEMPTS',5))
+JOB_RETRY_BASE_DELAY=float(os.environ.get('JOB_RETRY_BASE_DELAY',30))
+JOB_RETRY_MAX_DELAY=float(os.environ.get('JOB_RETRY_MAX_DELAY',3600))
+
+_stages:ContextVar[Optional[Dict[str,float]]]=ContextVar("job_stages",default=None)
+
+def utcnow()->datetime:
+    return datetime.now(timezone.utc)
+
+def ensure_job_table():
+    Job.__table__.create(engine,checkfirst=True)
+
+def enqueue(db:Session,kind:str,payload:Dict[str,Any],max_attempts:Optional[int]=None,run_at:Optional[datetime]=None,commit:bool=True)->Job:
+    """Add a job. With `commit=False` it becomes visible when the caller commits."""
+    job=Job(id=str(uuid.uuid4()),kind=kind,payload=payload,max_attempts=max_attempts or JOB_MAX_ATTEMPTS,run_at=run_at or utcnow())
+    db.add(job)
+    if commit:
+        db.commit()
+    metrics.incr(f"jobs.enqueued.{kind}")
+    return job
+
+def claim(worker_id:str,kinds:Optional[Iterable[str]]=None)->Optional[Job]:
+    """Lease the next runnable job for `worker_id`, or return None."""
+    db=SessionLocal()
+    try:
+        while True:
+            now=utcnow()
+            query=db.query(Job).filter(or_(and_(Job.status=="queued",Job.run_at<=now),and_(Job.status=="running",Job.locked_until<now)))
+            if kinds is not None:
+                query=query.filter(Job.kind.in_(list(kinds)))
+            job=query.order_by(Job.run_at).with_for_update(skip_locked=True).first()
+            if job is None:
+                db.rollback()
+                return None
+            if job.status!="running":
+                break
+            metrics.incr("jobs.lease_expired")
+            if job.attempts<job.max_attempts:
+                break
+            # the last attempt died with its worker (OOM, SIGKILL), fail() never ran
+            metrics.incr(f"jobs.failed.{job.kind}")
+            job.status="failed"
+            job.locked_by=None
+            job.locked_until=None
+            job.last_error="lease expired"
+            job.updatedAt=now
+            db.commit()
+        job.status="running"
+        job.attempts+=1
+        job.locked_by=worker_id
+        job.locked_until=now+timedelta(seconds=JOB_VISIBILITY_TIMEOUT)
+        db.commit()
+        db.refresh(job)
+        db.expunge(job)
+        # sqlite (tests) hands back naive datetimes
+        run_at=job.run_at if job.run_at.tzinfo else job.run_at.replace(tzinfo=timezone.utc)
+        metrics.observe(f"jobs.queue_wait_ms.{job.kind}",(now-run_at).total_seconds()*1000)
+        return job
+    finally:
+        db.close()
+
+def _update_owned(job:Job,worker_id:str,**values)->bool:
+    """Update the job only if `worker_id` still holds its lease."""
+    db=SessionLocal()
+    try:
+        result=db.execute(update(Job).where(Job.id==job.id,Job.locked_by==worker_id,Job.status=="running").values(updatedAt=utcnow(),**values))
+        db.commit()
+        return result.rowcount==1
+    finally:
+        db.close()
+
+def heartbeat(job:Job,worker_id:str)->bool:
+    return _update_owned(job,worker_id,locked_until=utcnow()+timedelta(seconds=JOB_VISIBILITY_TIMEOUT))
+
+def complete(job:Job,worker_id:str,stages:Dict[str,float])->bool:
+    metrics.incr(f"jobs.done.{job.kind}")
+    return _update_owned(job,worker_id,status="done",locked_by=None,locked_until=None,last_error=None,stages=stages)
+
+def retry_delay(attempts:int)->float:
+    delay=min(JOB_RETRY_MAX_DELAY,JOB_RETRY_BASE_DELAY*2**(attempts-1))
+    return delay*random.uniform(0.5,1.0)
+
+def fail(job:Job,worker_id:str,error:str,stages:Dict[str,float])->bool:
+    if job.attempts>=job.max_attempts:
+        metrics.incr(f"jobs.failed.{job.kind}")
+        return _update_owned(job,worker_id,status="failed",locked_by=None,locked_until=None,last_error=error,stages=stages)
+    metrics.incr(f"jobs.retried.{job.kind}")
+    return _update_owned(job,worker_id,status="queued",locked_by=None,locked_until=None,last_error=error,stages=stages,run_at=utcnow()+timedelta(seconds=retry_delay(job.attempts)))
+
+@contextmanager
+def collect_stages():
+    """Collect `stage` timings recorded in this context (and threads started from it)."""
+    stages:Dict[str,float]={}
+    token=_stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _stages.reset(token)
+
+@contextmanager
+def stage(name:str):
+    """Time a named processing stage of the current job."""
+    start=time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed=(time.perf_counter()-start)*1000
+        metrics.observe(f"job_stage.{name}_ms",elapsed)
+        stages=_stages.get()
+        if stages is not None:
+            stages[name]=round(elapsed,1)
@@ -1,15 +1,163 @@
+import importlib
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Callable, List, NamedTuple
 from langchain.chat_models import init_chat_model
 from langchain.prompts import ChatPromptTemplate,MessagesPlaceholder
-from tools import tools
+from langchain_core.messages import BaseMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from tools import get_tools,enabled_tool_names
+import metrics
+from tokens import approx_tokens
 
-Llm = init_chat_model("gpt-4.1-mini",model_provider="openai",streaming=True,temperature=0.4)
+# Models per route, see ModelRouter below.
+LLM_PROVIDER=os.environ.get('LLM_PROVIDER','openai')
+LLM_FAST_MODEL=os.environ.get('LLM_FAST_MODEL','gpt-4.1-mini')
+LLM_STRONG_MODEL=os.environ.get('LLM_STRONG_MODEL','gpt-4.1')
+
+@lru_cache(maxsize=None)
+def get_model(name):
+    # stream_usage so streamed responses still report (cached) prompt tokens
+    return init_chat_model(name,model_provider=LLM_PROVIDER,streaming=True,stream_usage=True,temperature=0.4)
+
+Llm = get_model(LLM_FAST_MODEL)
 
 prompt_template = ChatPromptTemplate(
     [
         ("system", "{system_message}"),
-        MessagesPlaceholder("messages")
+        MessagesPlaceholder("messages"),
+        # volatile per-request context goes last to keep the prefix cacheable
+        MessagesPlaceholder("context",optional=True)
     ]
 )
 
-with_tools=Llm.bind_tools(tools=tools)
-llm=prompt_template|with_tools
+@lru_cache(maxsize=None)
+def sorted_tools():
+    # Tool schemas are part of the prompt prefix, keep their order stable.
+    return tuple(sorted(get_tools(),key=lambda tool:tool.name))
+
+# One pre-bound runnable per distinct set of enabled tools; there are only a
+# handful of integration combinations so this stays small.
+LLM_BINDING_CACHE_SIZE=int(os.environ.get('LLM_BINDING_CACHE_SIZE',64))
+
+def schema_tokens(selected):
+    return approx_tokens("".join(json.dumps(convert_to_openai_tool(tool)) for tool in selected))
+
+@lru_cache(maxsize=None)
+def all_schema_tokens():
+    return schema_tokens(sorted_tools())
+
+@lru_cache(maxsize=LLM_BINDING_CACHE_SIZE)
+def bind_llm(tool_names:frozenset,model:str=LLM_FAST_MODEL):
+    selected=[tool for tool in sorted_tools() if tool.name in tool_names]
+    return prompt_template|get_model(model).bind_tools(tools=selected),schema_tokens(selected)
+
+def llm_for(api_keys,model:str=LLM_FAST_MODEL):
+    """The prompt|model runnable bound to the tools this user has keys for."""
+    runnable,tokens=bind_llm(enabled_tool_names(api_keys),model)
+    metrics.observe("llm.tool_schema_tokens",tokens)
+    metrics.incr("llm.tool_schema_tokens_saved",all_schema_tokens()-tokens)
+    return runnable
+
+metrics.register_collector("llm_bindings",lambda: bind_llm.cache_info()._asdict())
+
+_usage_lock=threading.Lock()
+_usage={"calls":0,"input_tokens":0,"cached_input_tokens":0}
+
+def record_usage(response,route=None):
+    """Account the provider-reported prompt tokens, and how many came from its prefix cache."""
+    usage=getattr(response,"usage_metadata",None)
+    if not usage:
+        return
+    if route:
+        metrics.incr(f"llm.route.{route}.input_tokens",usage.get("input_tokens",0))
+        metrics.incr(f"llm.route.{route}.output_tokens",usage.get("output_tokens",0))
+    cached=(usage.get("input_token_details") or {}).get("cache_read",0) or 0
+    with _usage_lock:
+        _usage["calls"]+=1
+        _usage["input_tokens"]+=usage.get("input_tokens",0)
+        _usage["cached_input_tokens"]+=cached
+    if usage.get("input_tokens"):
+        metrics.observe("llm.prompt_cache_hit_pct",100*cached/usage["input_tokens"])
+
+def usage_stats():
+    with _usage_lock:
+        stats=dict(_usage)
+    stats["cache_hit_rate"]=stats["cached_input_tokens"]/stats["input_tokens"] if stats["input_tokens"] else 0.0
+    return stats
+
+metrics.register_collector("llm_prompt_cache",usage_stats)
+
+# Routing: every agent turn is described by TurnFeatures and a policy maps
+# them to a route name, LLM_ROUTES maps route names to models. Set
+# LLM_ROUTER_POLICY=module:function to plug in another policy.
+LLM_ROUTES={"fast":LLM_FAST_MODEL,"strong":LLM_STRONG_MODEL}
+LLM_ROUTER_POLICY=os.environ.get('LLM_ROUTER_POLICY','')
+# Unsummarized history above this many tokens goes to the strong model.
+LLM_STRONG_HISTORY_TOKENS=int(os.environ.get('LLM_STRONG_HISTORY_TOKENS',8000))
+# So does a user message longer than this.
+LLM_STRONG_PROMPT_CHARS=int(os.environ.get('LLM_STRONG_PROMPT_CHARS',1500))
+
+# Wording that usually means the model has to pick a tool and fill in its arguments.
+TOOL_INTENT=re.compile(
+    r"\b(jira|issues?|tickets?|github|repo|branch(es)?|pull requests?|prs?|commits?|files?|slack|channels?|"
+    r"calendar|events?|meetings?|schedule|create|update|delete|send|move|search|list)\b",
+    re.IGNORECASE,
+)
+
+class TurnFeatures(NamedTuple):
+    request_type:str
+    history_tokens:int
+    prompt_chars:int
+    after_tool_result:bool
+    expects_tool_call:bool
+
+def turn_features(messages:List[BaseMessage],request_type:str="chat")->TurnFeatures:
+    last_human=next((m for m in reversed(messages) if isinstance(m,HumanMessage)),None)
+    text=last_human.content if last_human is not None and isinstance(last_human.content,str) else ""
+    return TurnFeatures(
+        request_type=request_type,
+        history_tokens=count_tokens_approximately(messages),
+        prompt_chars=len(text),
+        after_tool_result=bool(messages) and isinstance(messages[-1],ToolMessage),
+        expects_tool_call=bool(TOOL_INTENT.search(text)),
+    )
+
+def default_policy(features:TurnFeatures)->str:
+    # Internal runs (e.g. meeting task extraction) are rare and accuracy matters.
+    if features.request_type!="chat":
+        return "strong"
+    # Summarizing tool output is the bulk of turns and the easy part.
+    if features.after_tool_result:
+        return "fast"
+    if features.history_tokens>LLM_STRONG_HISTORY_TOKENS or features.prompt_chars>LLM_STRONG_PROMPT_CHARS:
+        return "strong"
+    if features.expects_tool_call:
+        return "strong"
+    return "fast"
+
+def load_policy(path:str)->Callable[[TurnFeatures],str]:
+    module,_,name=path.partition(":")
+    return getattr(importlib.import_module(module),name)
+
+class ModelRouter:
+    def __init__(self,routes=None,policy:Callable[[TurnFeatures],str]=None):
+        self.routes=routes or LLM_ROUTES
+        self.policy=policy or default_policy
+
+    def route(self,features:TurnFeatures)->str:
+        route=self.policy(features)
+        if route not in self.routes:
+            metrics.incr("llm.route.unknown")
+            route="fast"
+        metrics.incr(f"llm.route.{route}.calls")
+        return route
+
+    def model(self,route:str)->str:
+        return self.routes[route]
+
+router=ModelRouter(policy=load_policy(LLM_ROUTER_POLICY) if LLM_ROUTER_POLICY else None)
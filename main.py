@@ -4,20 +4,45 @@ from langchain_core.runnables import RunnableConfig
 from custom_tools.github_api_wrapper import GitHubAPIWrapper
 load_dotenv()
 
-from fastapi import FastAPI,WebSocket,Depends,WebSocketException,status,HTTPException,BackgroundTasks
+from fastapi import FastAPI,WebSocket,Depends,WebSocketException,status,HTTPException
 from sqlalchemy.orm import Session
 from fastapi.middleware.cors import CORSMiddleware
-from graph import graph,generate_system
-from meetings import Item,add_meeting_to_db
-from langchain.load.dump import dumps
+from fastapi.concurrency import run_in_threadpool
+from graph import SYSTEM_PROMPT,open_async_graph,close_async_graph,close_graph
+from chat_session import ChatSession
+from streaming import make_protocol
 from database import get_db
-from models import ChatToken,Meeting,WebhookPayload
-from typing import List
-import httpx
-import os
-from utils import get_api_keys
+from models import Meeting,WebhookPayload
+from typing import Optional
+from contextlib import asynccontextmanager
+import time
+from utils import fetch_api_keys,get_embeddings,get_pinecone,notify_api_keys_changed,start_api_keys_listener
+from tools import get_tools
+from auth import verify_chat_token,verify_internal_token,ensure_chat_token_index
+from jobs import enqueue,ensure_job_table
+from idempotency import ensure_webhook_table,find_replay,lock_webhook,record_webhook
+import metrics
+import checkpoints  # registers the checkpoint storage collector
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app:FastAPI):
+    ensure_job_table()
+    ensure_webhook_table()
+    ensure_chat_token_index()
+    # Clients are created lazily; build them here so the first chat does not pay for it.
+    await run_in_threadpool(get_tools)
+    await run_in_threadpool(get_embeddings)
+    await run_in_threadpool(get_pinecone)
+    await open_async_graph()
+    stop_listener=start_api_keys_listener()
+    try:
+        yield
+    finally:
+        stop_listener.set()
+        await close_async_graph()
+        await run_in_threadpool(close_graph)
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -30,53 +55,60 @@ app.add_middleware(
 def index():
     return {"status":"working"}
 
+@app.get('/metrics',dependencies=[Depends(verify_internal_token)])
+def get_metrics():
+    return metrics.snapshot()
+
+# For whatever edits ApiKey/Project/User rows outside this app (the dashboard).
+@app.post('/internal/invalidate_api_keys',dependencies=[Depends(verify_internal_token)])
+def invalidate_cached_api_keys(user_id:Optional[str]=None,project_id:Optional[str]=None,db: Session = Depends(get_db)):
+    if user_id is None and project_id is None:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY,"user_id or project_id is required")
+    notify_api_keys_changed(db,user_id=user_id,project_id=project_id)
+    return {"success":True}
+
 @app.websocket("/ws/{user_id}/{thread_id}")
-async def websocket_endpoint(websocket: WebSocket,user_id:str, thread_id: str,db: Session = Depends(get_db)):
-    token=db.query(ChatToken).filter(ChatToken.userId==user_id,ChatToken.sessionToken==thread_id).first()
-    if token is None:
+async def websocket_endpoint(websocket: WebSocket,user_id:str, thread_id: str,session:bool=False,protocol:str="legacy",coalesce_ms:Optional[float]=None,coalesce_bytes:Optional[int]=None):
+    start=time.perf_counter()
+    try:
+        frame_protocol=make_protocol(protocol,coalesce_ms,coalesce_bytes)
+    except ValueError as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION,reason=str(e))
+    if not await verify_chat_token(user_id,thread_id):
+        metrics.incr("ws.handshake_rejected")
         raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION,reason="Token invalid")
 
-    keys,project=get_api_keys(user_id,db)
+    keys,project=await run_in_threadpool(fetch_api_keys,user_id)
 
-    config:RunnableConfig = {"configurable": {"thread_id": thread_id,"__api_keys":keys,"project":project,"system_message":generate_system(keys,project)}}
+    config:RunnableConfig = {"configurable": {"thread_id": thread_id,"__api_keys":keys,"project":project,"system_message":SYSTEM_PROMPT}}
     if keys.GITHUB_REPOSITORY is not None:
-        with open(os.environ['GITHUB_APP_PRIVATE_FILE']) as f:
-            config['configurable']['github']=GitHubAPIWrapper(github_app_private_key=f.read(),github_repository=keys.GITHUB_REPOSITORY)
+        config['configurable']['github']=await run_in_threadpool(GitHubAPIWrapper.from_registry,keys.GITHUB_REPOSITORY)
     await websocket.accept()
-    while True:
-        data = await websocket.receive_text()
-        for event in graph.stream({"messages": [data]}, config=config, stream_mode="messages"):
-            await websocket.send_text(dumps(event, ensure_ascii=False))
-        await websocket.close()
-        return
+    metrics.observe("ws.handshake_ms",(time.perf_counter()-start)*1000)
+    chat=ChatSession(websocket,config,frame_protocol)
+    if session:
+        await chat.run_persistent()
+    else:
+        await chat.run_once()
 
+# Plain def: the advisory and row locks below block, so FastAPI runs this in its threadpool.
 @app.post('/attendee_webhook')
-async def add_meeting_transcript(payload:WebhookPayload,background_tasks: BackgroundTasks,db: Session = Depends(get_db)):
-    meeting=db.query(Meeting).filter(Meeting.bot_id==payload.bot_id).first()
+def add_meeting_transcript(payload:WebhookPayload,db: Session = Depends(get_db)):
+    lock_webhook(db,payload)
+    replay=find_replay(db,payload)
+    if replay is not None:
+        db.rollback()
+        return replay
+    # row lock: the worker records its stage statuses in bot_data too
+    meeting=db.query(Meeting).filter(Meeting.bot_id==payload.bot_id).with_for_update().first()
     if meeting is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND)
-    meeting.bot_data={"state":payload.data.new_state}
-    db.commit()
+    meeting.bot_data={**(meeting.bot_data or {}),"state":payload.data.new_state}
+    response={"success":True}
     if payload.data.new_state=='ended':
-        api_key = os.environ["ATTENDEE_APIKEY"]
-        if not api_key:
-            raise HTTPException(500, detail="Server misconfiguration: missing ATTENDEE_APIKEY")
-
-        url = f"https://app.attendee.dev/api/v1/bots/{payload.bot_id}/transcript"
-        headers = {
-            "Authorization": f"Token {api_key}",
-            "Content-Type": "application/json",
-        }
-        async with httpx.AsyncClient(timeout=10*60) as client:
-            resp = await client.get(url, headers=headers)
-        if resp.status_code != 200:
-            raise HTTPException(resp.status_code, detail=f"Failed to fetch transcript: {resp.text}")
-
-        transcript:List = resp.json()
-        final_captions=""
-        if len(transcript)>0:
-            for chunk in transcript:
-                if chunk['transcription']['transcript']:
-                    final_captions+= f"[{chunk['speaker_name']}]: {chunk['transcription']['transcript']}\n"
-        background_tasks.add_task(add_meeting_to_db, Item(user_id=meeting.userId,meeting_id=meeting.meeting_id,caption=final_captions))
-    return {"success":True}
+        # Transcript download and processing happen in worker.py
+        job=enqueue(db,"meeting.ended",{"bot_id":payload.bot_id,"user_id":meeting.userId,"meeting_id":meeting.meeting_id},commit=False)
+        response["job_id"]=job.id
+    record_webhook(db,payload,response)
+    db.commit()
+    return response
@@ -2,47 +2,129 @@ import os
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from pydantic import BaseModel
-from langchain_pinecone import PineconeVectorStore
 from utils import pinecone_check_index
 from llm import Llm
 from database import SessionLocal
-from utils import get_api_keys,embeddings,pc
-from models import Meeting
+from utils import get_api_keys,get_embeddings,get_pinecone
+from models import Meeting,TranscriptSegment
+from typing import List,Optional
+from chunking import chunk_segments
 import json
-from graph import graph
-from uuid import uuid4
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime,timezone
+from graph import get_ephemeral_graph
+from jobs import stage
+from ingestion import index_meeting
+from summarization import DatabaseSummaryCache,summarize
 
 class Item(BaseModel):
     user_id: str
     meeting_id: str
     caption: str
+    # when present, chunks follow utterance boundaries (see chunking.py)
+    segments: Optional[List[TranscriptSegment]] = None
+
+# Post-processing of an ended meeting. The stages only need the transcript, so
+# they run concurrently and each one records its status in Meeting.bot_data["stages"].
+# A retried job skips the stages that are done.
+# Not retried after a failure: the agent may already have created some of the Jira issues.
+NO_RETRY_STAGES = ("tasks",)
+
+def set_stage_status(meeting_id:str,name:str,status:str,error:Optional[str]=None):
+    db=SessionLocal()
+    try:
+        # row lock, so concurrent stages and webhooks don't overwrite each other's bot_data
+        meeting=db.query(Meeting).filter(Meeting.meeting_id==meeting_id).with_for_update().first()
+        if meeting is None:
+            return
+        bot_data=dict(meeting.bot_data or {})
+        stages=dict(bot_data.get("stages",{}))
+        stages[name]={"status":status,"at":datetime.now(timezone.utc).isoformat()}
+        if error:
+            stages[name]["error"]=error
+        bot_data["stages"]=stages
+        meeting.bot_data=bot_data
+        db.commit()
+    finally:
+        db.close()
+
+def stage_statuses(meeting_id:str)->dict:
+    db=SessionLocal()
+    try:
+        meeting=db.query(Meeting).filter(Meeting.meeting_id==meeting_id).first()
+        return dict((meeting.bot_data or {}).get("stages",{})) if meeting else {}
+    finally:
+        db.close()
+
+def run_stage(item:Item,name:str,fn,previous:dict):
+    status=previous.get(name,{}).get("status")
+    if status in ("done","skipped") or (status in ("failed","running") and name in NO_RETRY_STAGES):
+        # "running" here was left by a worker that died mid-stage (the meeting lock
+        # rules out a live one), so a no-retry stage may have done part of its work
+        print(f"Meeting {item.meeting_id}: {name} already {status}")
+        if status=="running":
+            set_stage_status(item.meeting_id,name,"failed","interrupted")
+        return
+    set_stage_status(item.meeting_id,name,"running")
+    try:
+        with stage(name):
+            status=fn(item) or "done"
+    except Exception as e:
+        print(f"Meeting {item.meeting_id}: {name} failed: ",e)
+        set_stage_status(item.meeting_id,name,"failed",str(e))
+        if name in NO_RETRY_STAGES:
+            return
+        raise
+    set_stage_status(item.meeting_id,name,status)
 
 def add_meeting_to_db(item:Item):
+    previous=stage_statuses(item.meeting_id)
+    with ThreadPoolExecutor(max_workers=len(MEETING_STAGES),thread_name_prefix="meeting") as pool:
+        # each stage runs in a copy of this context so its stage() timing reaches the job
+        futures={name:pool.submit(contextvars.copy_context().run,run_stage,item,name,fn,previous) for name,fn in MEETING_STAGES.items()}
+    failed={name:future.exception() for name,future in futures.items() if future.exception() is not None}
+    if failed:
+        raise RuntimeError(f"Meeting {item.meeting_id} stages failed: "+", ".join(f"{name}: {e}" for name,e in failed.items()))
+
+def index_transcript(item:Item):
+    pc=get_pinecone()
     pinecone_check_index(pc)
     index = pc.Index(os.environ['PINECONE_VECTOR_NAME'])
 
-    vector_store = PineconeVectorStore(index=index, embedding=embeddings)
+    metadata={
+        "user_id":item.user_id,
+        "meeting_id":item.meeting_id,
+        "source": "meeting"
+    }
+    if item.segments:
+        new_chunks = chunk_segments(item.segments,metadata)
+    else:
+        doc = Document(page_content=item.caption,metadata=metadata)
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=200,
+        length_function=len,)
+        new_chunks = text_splitter.split_documents([doc])
+    stats=index_meeting(index,get_embeddings(),item.meeting_id,new_chunks)
+    print(f"Indexed meeting {item.meeting_id}: {stats['chunks']} chunks at {stats['chunks_per_sec']:.1f} chunks/sec")
 
-    doc = Document(page_content=item.caption,
-        metadata={
-            "user_id":item.user_id,
-            "meeting_id":item.meeting_id,
-            "source": "meeting"
-        }
-    )
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=200,
-    length_function=len,)
-    new_chunks = text_splitter.split_documents([doc])
-    vector_store.add_documents(new_chunks)
+def save_meeting(meeting_id:str,**values):
+    db=SessionLocal()
+    try:
+        db.query(Meeting).filter(Meeting.meeting_id==meeting_id).update(values)
+        db.commit()
+    finally:
+        db.close()
 
+def create_meeting_tasks(item:Item):
     db=SessionLocal()
     try:
-        meeting=db.query(Meeting).filter(Meeting.meeting_id==item.meeting_id).first()
-        keys,project=get_api_keys(item.user_id,SessionLocal())
-        try:
-            if keys.JIRA_API_TOKEN is not None and keys.JIRA_INSTANCE_URL is not None and keys.JIRA_USERNAME is not None:
-                prompt=f"""Jira Project key: `{keys.JIRA_PROJECT}`\n
-You are an AI assistant whose job is to extract *actionable* items from a meeting transcript and turn each one into a Jira task by invoking the `create_issue` tool.
+        keys,project=get_api_keys(item.user_id,db)
+    finally:
+        db.close()
+    if keys.JIRA_API_TOKEN is None or keys.JIRA_INSTANCE_URL is None or keys.JIRA_USERNAME is None:
+        print("API_KEYS not found")
+        return "skipped"
+    prompt=f"""You are an AI assistant whose job is to extract *actionable* items from a meeting transcript and turn each one into a Jira task by invoking the `create_issue` tool.
 *Actionable* items are first-person commitments or owner-assigned deliverables that specify a clear action (e.g., "I will update the doc," "Alice will do X by next week"). Skip any general discussion, brainstorming points without owners, or vague ideas.
 
 For each action item:
@@ -51,7 +133,7 @@ For each action item:
 After you successfully create action items, reply exactly their json response comma separated in a json array
 If you cannot create action items, reply exactly `[]`
 """
-                prompt2=f"""---
+    prompt2=f"""---
 **Meeting Transcript:**
 \"\"\"
 {item.caption}
@@ -59,37 +141,24 @@ If you cannot create action items, reply exactly `[]`
 **End of Meeting Transcript**
 ---
 """
-                config = {"configurable": {"thread_id": f"meeting_{str(uuid4())}","__api_keys":keys,"project":project,"system_message":prompt}}
-                chain=graph.invoke({"messages":[prompt2]},config=config)
-                if len(chain['messages']) > 1:
-                    response=chain['messages'][-1]
-                    if len(response.content) > 1:
-                        meeting.tasks=json.loads(response.content)
-                        db.commit()
-                    else:
-                        print("No tasks found")
-            else:
-                print("API_KEYS not found")
-        except Exception as e:
-            print("Error while making tasks from meeting: ",e)
-        try:
+    config = {"configurable": {"__api_keys":keys,"project":project,"request_type":"meeting_tasks","system_message":prompt,"system_context":f"Jira Project key: `{keys.JIRA_PROJECT}`"}}
+    chain=get_ephemeral_graph().invoke({"messages":[prompt2]},config=config)
+    if len(chain['messages']) > 1:
+        response=chain['messages'][-1]
+        if len(response.content) > 1:
+            save_meeting(item.meeting_id,tasks=json.loads(response.content))
+        else:
+            print("No tasks found")
 
-            prompt=f"""Give summary of this meeting:
-    ---
-    **Meeting Transcript:**
-    \"\"\"
-    {item.caption}
-    \"\"\"
-    **End of Meeting Transcript**
-    ---
-    """
-            response = Llm.invoke(prompt)
-            if len(response.content)>1:
-                meeting.summary=response.content
-                db.commit()
-        except Exception as e:
-            print("Error while generating summary: ",e)
-    except Exception as e:
-        print("Something went wrong while adding meeting to DB: ",e)
-    finally:
-        db.close()
+def summarize_meeting(item:Item):
+    summary=summarize(Llm,item.meeting_id,item.caption)
+    if len(summary)>1:
+        save_meeting(item.meeting_id,summary=summary)
+    # partial summaries are only needed to resume a failed run
+    DatabaseSummaryCache().clear(item.meeting_id)
+
+MEETING_STAGES = {
+    "index": index_transcript,
+    "tasks": create_meeting_tasks,
+    "summary": summarize_meeting,
+}
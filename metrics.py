@@ -0,0 +1,72 @@
+# In-process counters, gauges, timings and collectors, served by GET /metrics.
+import os
+import threading
+import time
+from collections import defaultdict,deque
+from contextlib import contextmanager
+from typing import Callable,Dict,Iterable
+
+# How many recent samples are kept per timing series for percentiles.
+SAMPLE_SIZE=int(os.environ.get('METRICS_SAMPLE_SIZE',2048))
+
+_lock=threading.Lock()
+_counters:Dict[str,float]=defaultdict(float)
+_gauges:Dict[str,float]={}
+_samples:Dict[str,deque]=defaultdict(lambda:deque(maxlen=SAMPLE_SIZE))
+_collectors:Dict[str,Callable[[],dict]]={}
+
+def incr(name:str,value:float=1):
+    with _lock:
+        _counters[name]+=value
+
+def gauge(name:str,value:float):
+    with _lock:
+        _gauges[name]=value
+
+def observe(name:str,value:float):
+    with _lock:
+        _samples[name].append(value)
+
+@contextmanager
+def timer(name:str):
+    """Observe the wall time of the block in milliseconds."""
+    start=time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name,(time.perf_counter()-start)*1000)
+
+def register_collector(name:str,collector:Callable[[],dict]):
+    """Register a callable whose dict is included in every snapshot under `name`."""
+    _collectors[name]=collector
+
+def percentile(values:list,q:float)->float:
+    if not values:
+        return 0.0
+    index=min(len(values)-1,max(0,round(q*(len(values)-1))))
+    return values[index]
+
+def summarize(values:Iterable[float])->dict:
+    values=sorted(values)
+    if not values:
+        return {"count":0}
+    return {"count":len(values),"avg":sum(values)/len(values),"p50":percentile(values,0.50),"p95":percentile(values,0.95),"p99":percentile(values,0.99),"max":values[-1]}
+
+def snapshot()->dict:
+    with _lock:
+        counters=dict(_counters)
+        gauges=dict(_gauges)
+        samples={name:list(values) for name,values in _samples.items()}
+    collected={}
+    for name,collector in list(_collectors.items()):
+        try:
+            collected[name]=collector()
+        except Exception as e:
+            collected[name]={"error":str(e)}
+    return {"counters":counters,"gauges":gauges,"timings":{name:summarize(values) for name,values in samples.items()},"collectors":collected}
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _samples.clear()
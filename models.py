@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String,JSON,DateTime,Boolean,ForeignKey,Integer
+from sqlalchemy import Column, String,JSON,DateTime,Boolean,ForeignKey,Integer,Index,LargeBinary
 from sqlalchemy.orm import relationship
 import uuid
 from datetime import datetime,timezone
@@ -47,6 +47,9 @@ class ChatToken(Base):
     # relations
     user = relationship("User", back_populates="chattoken")
 
+    # Covers the websocket handshake lookup (userId, sessionToken).
+    __table_args__ = (Index("ChatToken_userId_sessionToken_idx", "userId", "sessionToken"),)
+
 
 class Project(Base):
     __tablename__ = "Project"
@@ -117,6 +120,65 @@ class Meeting(Base):
     user = relationship("User", back_populates="meetings")
     project = relationship("Project", back_populates="meetings")
 
+class Job(Base):
+    """Background work item, see jobs.py. Owned by this service, not the dashboard."""
+    __tablename__ = "Job"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    # queued -> running -> done, or back to queued until max_attempts, then failed
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    locked_by = Column(String, nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(String, nullable=True)
+    # stage name -> milliseconds, for the last attempt
+    stages = Column(JSON, nullable=False, default=dict)
+    createdAt = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    updatedAt = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    __table_args__ = (Index("Job_status_run_at_idx", "status", "run_at"),)
+
+class WebhookEvent(Base):
+    """Processed webhook deliveries, see idempotency.py."""
+    __tablename__ = "WebhookEvent"
+
+    idempotency_key = Column(String, primary_key=True)
+    bot_id = Column(String, nullable=False)
+    new_state = Column(String, nullable=False)
+    # what the webhook answered, returned again on replays
+    response = Column(JSON, nullable=False, default=dict)
+    createdAt = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (Index("WebhookEvent_bot_id_new_state_idx", "bot_id", "new_state"),)
+
+class EmbeddingCache(Base):
+    """Embeddings by model and sha256 of the text, see ingestion.py."""
+    __tablename__ = "EmbeddingCache"
+
+    model = Column(String, primary_key=True)
+    text_hash = Column(String, primary_key=True)
+    # float32 values, packed
+    embedding = Column(LargeBinary, nullable=False)
+    createdAt = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+class SummaryCache(Base):
+    """Section and combined summaries of a meeting by prompt hash, see summarization.py."""
+    __tablename__ = "SummaryCache"
+
+    meeting_id = Column(String, primary_key=True)
+    prompt_hash = Column(String, primary_key=True)
+    summary = Column(String, nullable=False)
+    createdAt = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
 class ApiKeys(BaseModel):
     user_id:Optional[str]=None
     project_id:Optional[str]=None
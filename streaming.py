@@ -0,0 +1,279 @@
+# Websocket frame protocols. `legacy` sends each (message, metadata) event as a
+# langchain `dumps` envelope, `compact` (v1) sends small orjson frames:
+#   {"v":1,"t":"d","id":<message id>,"d":<text delta>}
+#   {"v":1,"t":"tool_call","id":..,"n":<node>,"calls":[{"id","name","args","index"}]}
+#   {"v":1,"t":"tool_result","id":..,"n":..,"name":..,"tool_call_id":..,"status":..,"content":..}
+#   {"v":1,"t":"message","id":..,"n":..,"type":..,"content":..}
+#   {"v":1,"t":"end"} / {"v":1,"t":"ping"} / {"v":1,"t":"pong"}
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Any,List,Optional,Tuple,Union
+
+import orjson
+from fastapi import WebSocket,status
+from langchain.load.dump import dumps
+from langchain_core.messages import AIMessage,AIMessageChunk,BaseMessage,ToolMessage
+
+import metrics
+
+PROTOCOL_VERSION=1
+
+# Server-wide coalescing defaults, a client can override them per socket.
+WS_COALESCE_MS=float(os.environ.get('WS_COALESCE_MS',0))
+WS_COALESCE_BYTES=int(os.environ.get('WS_COALESCE_BYTES',0))
+
+# Frames buffered per socket before the slow-consumer policy applies.
+WS_SEND_QUEUE_SIZE=int(os.environ.get('WS_SEND_QUEUE_SIZE',256))
+# What to do when a socket's queue is full:
+#   coalesce   - merge unsent text deltas, otherwise wait for room
+#   drop       - discard new text deltas (lossy), wait for room for anything else
+#   disconnect - close the socket with 1013 (try again later)
+WS_SLOW_CONSUMER_POLICY=os.environ.get('WS_SLOW_CONSUMER_POLICY','coalesce')
+SLOW_CONSUMER_POLICIES=("coalesce","drop","disconnect")
+
+# A frame is a compact frame dict or an already encoded legacy string.
+Frame=Union[dict,str]
+
+def encode_frame(frame:dict)->str:
+    return orjson.dumps(frame).decode()
+
+def message_text(content:Any)->str:
+    if isinstance(content,str):
+        return content
+    parts=[]
+    for block in content or []:
+        if isinstance(block,str):
+            parts.append(block)
+        elif isinstance(block,dict) and block.get("type")=="text":
+            parts.append(block.get("text",""))
+    return "".join(parts)
+
+def event_frames(event:Tuple[BaseMessage,dict])->List[dict]:
+    """Translate one `stream_mode="messages"` event into compact frames."""
+    message,metadata=event
+    node=metadata.get("langgraph_node")
+    if isinstance(message,ToolMessage):
+        return [{
+            "v":PROTOCOL_VERSION,"t":"tool_result","id":message.id,"n":node,
+            "name":message.name,"tool_call_id":message.tool_call_id,
+            "status":message.status,"content":message.content,
+        }]
+    if isinstance(message,AIMessage):
+        frames=[]
+        text=message_text(message.content)
+        if text:
+            frames.append({"v":PROTOCOL_VERSION,"t":"d","id":message.id,"d":text})
+        if isinstance(message,AIMessageChunk):
+            calls=[{"id":c.get("id"),"name":c.get("name"),"args":c.get("args"),"index":c.get("index")} for c in message.tool_call_chunks]
+        else:
+            calls=[{"id":c["id"],"name":c["name"],"args":c["args"]} for c in message.tool_calls]
+        if calls:
+            frames.append({"v":PROTOCOL_VERSION,"t":"tool_call","id":message.id,"n":node,"calls":calls})
+        return frames
+    return [{"v":PROTOCOL_VERSION,"t":"message","id":message.id,"n":node,"type":message.type,"content":message.content}]
+
+class DeltaCoalescer:
+    """Merges consecutive text deltas of one message until `max_delay_ms` or `max_bytes` (0 and 0 disables it)."""
+
+    def __init__(self,max_delay_ms:float=0,max_bytes:int=0):
+        self.max_delay=max_delay_ms/1000
+        self.max_bytes=max_bytes
+        self.pending:Optional[dict]=None
+        self.pending_since=0.0
+
+    @property
+    def enabled(self)->bool:
+        return self.max_delay>0 or self.max_bytes>0
+
+    def push(self,frame:dict)->List[dict]:
+        if not self.enabled:
+            return [frame]
+        if frame["t"]!="d":
+            return self.flush()+[frame]
+        out=[]
+        if self.pending is not None and self.pending["id"]==frame["id"]:
+            self.pending["d"]+=frame["d"]
+        else:
+            out=self.flush()
+            self.pending=dict(frame)
+            self.pending_since=time.monotonic()
+        if self.due():
+            out.extend(self.flush())
+        return out
+
+    def time_to_due(self)->Optional[float]:
+        """Seconds until the pending delta is due by time, None if nothing waits on a timer."""
+        if self.pending is None or not self.max_delay:
+            return None
+        return max(0.0,self.pending_since+self.max_delay-time.monotonic())
+
+    def due(self)->bool:
+        if self.pending is None:
+            return False
+        if self.max_bytes and len(self.pending["d"])>=self.max_bytes:
+            return True
+        return bool(self.max_delay) and time.monotonic()-self.pending_since>=self.max_delay
+
+    def flush(self)->List[dict]:
+        if self.pending is None:
+            return []
+        frame,self.pending=self.pending,None
+        return [frame]
+
+class LegacyProtocol:
+    name="legacy"
+
+    def frames(self,event:Tuple[BaseMessage,dict])->List[Frame]:
+        return [dumps(event,ensure_ascii=False)]
+
+    def flush(self)->List[Frame]:
+        return []
+
+    def flush_due(self)->List[Frame]:
+        return []
+
+    def time_to_due(self)->Optional[float]:
+        return None
+
+    def control(self,kind:str)->Frame:
+        return json.dumps({"type":kind})
+
+    def serialize(self,frame:Frame)->str:
+        return frame
+
+class CompactProtocol:
+    name="compact"
+
+    def __init__(self,coalesce_ms:float=0,coalesce_bytes:int=0):
+        self.coalescer=DeltaCoalescer(coalesce_ms,coalesce_bytes)
+
+    def frames(self,event:Tuple[BaseMessage,dict])->List[Frame]:
+        out=[]
+        for frame in event_frames(event):
+            out.extend(self.coalescer.push(frame))
+        return out
+
+    def flush(self)->List[Frame]:
+        return self.coalescer.flush()
+
+    def flush_due(self)->List[Frame]:
+        return self.coalescer.flush() if self.coalescer.due() else []
+
+    def time_to_due(self)->Optional[float]:
+        return self.coalescer.time_to_due()
+
+    def control(self,kind:str)->Frame:
+        return {"v":PROTOCOL_VERSION,"t":kind}
+
+    def serialize(self,frame:Frame)->str:
+        return encode_frame(frame)
+
+def make_protocol(name:str="legacy",coalesce_ms:Optional[float]=None,coalesce_bytes:Optional[int]=None):
+    if name=="legacy":
+        return LegacyProtocol()
+    if name=="compact":
+        return CompactProtocol(WS_COALESCE_MS if coalesce_ms is None else coalesce_ms,WS_COALESCE_BYTES if coalesce_bytes is None else coalesce_bytes)
+    raise ValueError(f"Unknown websocket protocol: {name}")
+
+def is_delta(frame:Frame)->bool:
+    return isinstance(frame,dict) and frame.get("t")=="d"
+
+class SlowConsumerError(Exception):
+    """Raised to the producer when a socket was closed for not keeping up."""
+
+class SendQueue:
+    """Bounded outbound frame queue drained by its own sender task, so a slow client can't stall the graph stream."""
+
+    def __init__(self,websocket:WebSocket,protocol,maxsize:int=WS_SEND_QUEUE_SIZE,policy:str=WS_SLOW_CONSUMER_POLICY):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.websocket=websocket
+        self.protocol=protocol
+        self.maxsize=max(1,maxsize)
+        self.policy=policy
+        self.items:deque=deque()
+        self.not_empty=asyncio.Event()
+        self.not_full=asyncio.Event()
+        self.not_full.set()
+        self.closing=False
+        self.error:Optional[BaseException]=None
+        self.task:Optional[asyncio.Task]=None
+
+    def start(self)->"SendQueue":
+        self.task=asyncio.create_task(self._sender())
+        return self
+
+    async def put(self,frame:Frame):
+        if self.error is not None:
+            raise self.error
+        if self.policy=="coalesce" and is_delta(frame) and self.items:
+            tail=self.items[-1]
+            if is_delta(tail) and tail["id"]==frame["id"]:
+                tail["d"]+=frame["d"]
+                metrics.incr("ws.deltas_coalesced")
+                return
+        while len(self.items)>=self.maxsize:
+            if self.policy=="drop" and is_delta(frame):
+                metrics.incr("ws.deltas_dropped")
+                return
+            if self.policy=="disconnect":
+                metrics.incr("ws.slow_consumer_disconnects")
+                self.error=SlowConsumerError("Client is not reading fast enough")
+                self.items.clear()
+                await self.websocket.close(code=status.WS_1013_TRY_AGAIN_LATER,reason="Slow consumer")
+                raise self.error
+            self.not_full.clear()
+            await self.not_full.wait()
+            if self.error is not None:
+                raise self.error
+        self.items.append(frame)
+        metrics.observe("ws.send_queue_depth",len(self.items))
+        self.not_empty.set()
+
+    async def put_all(self,frames:List[Frame]):
+        for frame in frames:
+            await self.put(frame)
+
+    async def _wait_for_frames(self):
+        self.not_empty.clear()
+        try:
+            await asyncio.wait_for(self.not_empty.wait(),timeout=self.protocol.time_to_due())
+        except asyncio.TimeoutError:
+            # Time-coalesced text is waiting and nothing else is queued
+            # behind it, release it now instead of on the next token.
+            for frame in self.protocol.flush_due():
+                self.items.append(frame)
+
+    async def _sender(self):
+        try:
+            while True:
+                if not self.items:
+                    if self.closing:
+                        return
+                    await self._wait_for_frames()
+                    continue
+                frame=self.items.popleft()
+                self.not_full.set()
+                start=time.perf_counter()
+                await self.websocket.send_text(self.protocol.serialize(frame))
+                metrics.observe("ws.send_ms",(time.perf_counter()-start)*1000)
+        except Exception as e:
+            self.error=e
+            self.items.clear()
+            self.not_full.set()
+
+    async def drain(self):
+        """Send everything queued so far and stop the sender task."""
+        self.closing=True
+        self.not_empty.set()
+        if self.task is not None:
+            await self.task
+        if self.error is not None and not isinstance(self.error,SlowConsumerError):
+            raise self.error
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
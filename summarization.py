@@ -0,0 +1,136 @@
+# Map-reduce meeting summaries: long transcripts are summarized per section,
+# concurrently, then combined. Every partial result goes to the SummaryCache
+# table, so a retried job only redoes what did not finish.
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor,as_completed
+from typing import Dict,Iterable,List
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+import metrics
+from database import SessionLocal,engine
+from models import SummaryCache
+from tokens import CHARS_PER_TOKEN,approx_tokens
+
+SUMMARY_SECTION_TOKENS=int(os.environ.get('SUMMARY_SECTION_TOKENS',12000))
+SUMMARY_REDUCE_TOKENS=int(os.environ.get('SUMMARY_REDUCE_TOKENS',6000))
+SUMMARY_CONCURRENCY=int(os.environ.get('SUMMARY_CONCURRENCY',8))
+
+SUMMARY_PROMPT="""Give summary of this meeting:
+---
+**Meeting Transcript:**
+\"\"\"
+{text}
+\"\"\"
+**End of Meeting Transcript**
+---
+"""
+
+SECTION_PROMPT="""This is part {part} of {parts} of a meeting transcript. Summarize it: keep decisions, action items with their owners and dates, open questions and who raised what. Reply with the summary only.
+---
+**Transcript part {part}:**
+\"\"\"
+{text}
+\"\"\"
+---
+"""
+
+COMBINE_PROMPT="""These are summaries of consecutive parts of one meeting, in order. Give summary of this meeting by combining them into one, without repeating points and without mentioning the parts.
+---
+{text}
+---
+"""
+
+def ensure_summary_cache_table():
+    SummaryCache.__table__.create(engine,checkfirst=True)
+
+def sections(text:str,max_tokens:int)->List[str]:
+    # captions have one utterance per line, so prefer cutting between lines
+    splitter=RecursiveCharacterTextSplitter(chunk_size=max_tokens*CHARS_PER_TOKEN,chunk_overlap=0,separators=["\n",". "," ",""])
+    return splitter.split_text(text)
+
+def groups(summaries:List[str],max_tokens:int)->List[List[str]]:
+    """Consecutive summaries packed up to `max_tokens`, at least two per group so every round shrinks."""
+    packed,current,size=[],[],0
+    for summary in summaries:
+        if len(current)>=2 and size+approx_tokens(summary)>max_tokens:
+            packed.append(current)
+            current,size=[],0
+        current.append(summary)
+        size+=approx_tokens(summary)
+    if len(current)==1 and packed:
+        packed[-1].append(current[0])
+    elif current:
+        packed.append(current)
+    return packed
+
+def prompt_hash(llm,prompt:str)->str:
+    model=getattr(llm,"model_name",None) or type(llm).__name__
+    return hashlib.sha256(f"{model}\n{prompt}".encode()).hexdigest()
+
+class DatabaseSummaryCache:
+    def get_many(self,meeting_id:str,hashes:Iterable[str])->Dict[str,str]:
+        db=SessionLocal()
+        try:
+            rows=db.query(SummaryCache.prompt_hash,SummaryCache.summary).filter(SummaryCache.meeting_id==meeting_id,SummaryCache.prompt_hash.in_(list(set(hashes))))
+            return {row.prompt_hash:row.summary for row in rows}
+        finally:
+            db.close()
+
+    def put(self,meeting_id:str,key:str,summary:str):
+        db=SessionLocal()
+        try:
+            db.merge(SummaryCache(meeting_id=meeting_id,prompt_hash=key,summary=summary))
+            db.commit()
+        finally:
+            db.close()
+
+    def clear(self,meeting_id:str):
+        db=SessionLocal()
+        try:
+            db.query(SummaryCache).filter(SummaryCache.meeting_id==meeting_id).delete()
+            db.commit()
+        finally:
+            db.close()
+
+def run_prompts(llm,meeting_id:str,prompts:List[str],cache,concurrency:int)->List[str]:
+    """Responses to `prompts`, from the cache where possible. Each new response is cached on arrival."""
+    hashes=[prompt_hash(llm,prompt) for prompt in prompts]
+    found=cache.get_many(meeting_id,hashes)
+    missing={h:prompt for h,prompt in zip(hashes,prompts) if h not in found}
+    metrics.incr("summary.cache_hits",len(set(hashes))-len(missing))
+    metrics.incr("summary.calls",len(missing))
+    errors=[]
+    if missing:
+        with ThreadPoolExecutor(max_workers=concurrency,thread_name_prefix="summary") as pool:
+            futures={pool.submit(llm.invoke,prompt):h for h,prompt in missing.items()}
+            for future in as_completed(futures):
+                try:
+                    summary=future.result().content
+                except Exception as e:
+                    # keep collecting the others so a retry does not redo them
+                    errors.append(e)
+                    continue
+                cache.put(meeting_id,futures[future],summary)
+                found[futures[future]]=summary
+    if errors:
+        raise errors[0]
+    return [found[h] for h in hashes]
+
+def summarize(llm,meeting_id:str,text:str,cache=None,section_tokens:int=SUMMARY_SECTION_TOKENS,reduce_tokens:int=SUMMARY_REDUCE_TOKENS,concurrency:int=SUMMARY_CONCURRENCY)->str:
+    cache=cache if cache is not None else DatabaseSummaryCache()
+    parts=sections(text,section_tokens)
+    metrics.observe("summary.sections",len(parts))
+    if len(parts)<=1:
+        return run_prompts(llm,meeting_id,[SUMMARY_PROMPT.format(text=text)],cache,1)[0]
+    with metrics.timer("summary.map_ms"):
+        prompts=[SECTION_PROMPT.format(part=i+1,parts=len(parts),text=part) for i,part in enumerate(parts)]
+        summaries=run_prompts(llm,meeting_id,prompts,cache,concurrency)
+    with metrics.timer("summary.reduce_ms"):
+        while True:
+            packed=groups(summaries,reduce_tokens)
+            prompts=[COMBINE_PROMPT.format(text="\n---\n".join(group)) for group in packed]
+            summaries=run_prompts(llm,meeting_id,prompts,cache,concurrency)
+            if len(summaries)==1:
+                return summaries[0]
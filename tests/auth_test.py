@@ -0,0 +1,69 @@
+import os
+
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import auth
+
+
+def test_metrics_need_the_internal_token(monkeypatch):
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    monkeypatch.setattr(auth, "INTERNAL_API_TOKEN", None)
+    assert client.get("/metrics").status_code == 401
+    monkeypatch.setattr(auth, "INTERNAL_API_TOKEN", "s3cret")
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+
+def _count_lookups(monkeypatch, valid):
+    from cache import StatsCache
+    calls = []
+
+    def lookup(user_id, session_token):
+        calls.append((user_id, session_token))
+        return valid
+
+    monkeypatch.setattr(auth, "lookup_chat_token", lookup)
+    monkeypatch.setattr(auth, "valid_tokens", StatsCache("test_chat_token_cache", maxsize=10, ttl=60))
+    monkeypatch.setattr(auth, "invalid_tokens", StatsCache("test_chat_token_negative_cache", maxsize=10, ttl=60))
+    return calls
+
+
+def test_valid_token_is_cached(monkeypatch):
+    import asyncio
+    calls = _count_lookups(monkeypatch, True)
+    assert asyncio.run(auth.verify_chat_token("u1", "t1"))
+    assert asyncio.run(auth.verify_chat_token("u1", "t1"))
+    assert calls == [("u1", "t1")]
+
+
+def test_invalid_token_is_cached(monkeypatch):
+    import asyncio
+    calls = _count_lookups(monkeypatch, False)
+    assert not asyncio.run(auth.verify_chat_token("u1", "bad"))
+    assert not asyncio.run(auth.verify_chat_token("u1", "bad"))
+    assert calls == [("u1", "bad")]
+
+
+def test_token_writes_clear_the_cache(monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from models import ChatToken
+
+    _count_lookups(monkeypatch, False)
+    auth.invalid_tokens.set(("u1", "t1"), True)
+    auth.valid_tokens.set(("u2", "t2"), True)
+    engine = create_engine("sqlite://")
+    ChatToken.__table__.create(engine)
+    with Session(engine) as db:
+        db.add(ChatToken(userId="u1", sessionToken="t1"))
+        db.commit()
+        assert auth.invalid_tokens.get(("u1", "t1"), None) is None
+        db.add(ChatToken(id="c2", userId="u2", sessionToken="t2"))
+        db.commit()
+        assert auth.valid_tokens.get(("u2", "t2"), None)
+        db.delete(db.get(ChatToken, "c2"))
+        db.commit()
+        assert auth.valid_tokens.get(("u2", "t2"), None) is None
@@ -0,0 +1,127 @@
+import time
+import pytest
+
+from cache import StatsCache, MISSING
+
+def test_hit_miss_counters():
+    cache = StatsCache("test_cache_counters", maxsize=10, ttl=60)
+    assert cache.get("a") is MISSING
+    assert cache.get("a", None) is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+def test_ttl_and_size_bound():
+    cache = StatsCache("test_cache_ttl", maxsize=2, ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.stats()["size"] == 2
+    time.sleep(0.1)
+    assert cache.get("c", None) is None
+
+def test_invalidation():
+    cache = StatsCache("test_cache_invalidation", maxsize=10, ttl=60)
+    cache.set("u1", ("keys", "p1"))
+    cache.set("u2", ("keys", "p1"))
+    cache.set("u3", ("keys", "p2"))
+    assert cache.invalidate_where(lambda key, value: value[1] == "p1") == 2
+    cache.invalidate("u3")
+    cache.invalidate("missing")
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["invalidations"] == 3
+
+def test_fetch_api_keys_counts_one_miss(monkeypatch):
+    import os
+    os.environ.setdefault("DATABASE_URI", "sqlite://")
+    import utils
+
+    class Project:
+        id = "p1"
+
+    class Session:
+        def expunge(self, obj):
+            pass
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(utils, "api_keys_cache", StatsCache("test_api_keys_cache", maxsize=10, ttl=60))
+    monkeypatch.setattr(utils, "load_api_keys", lambda user_id, db: ("keys", Project()))
+    monkeypatch.setattr("database.SessionLocal", Session)
+    utils.fetch_api_keys("u1")
+    utils.fetch_api_keys("u1")
+    stats = utils.api_keys_cache.stats()
+    assert (stats["misses"], stats["hits"]) == (1, 1)
+
+
+def _seed_api_keys_cache(monkeypatch):
+    import os
+    os.environ.setdefault("DATABASE_URI", "sqlite://")
+    import utils
+
+    class Project:
+        def __init__(self, id):
+            self.id = id
+
+    cache = StatsCache("test_api_keys_invalidation", maxsize=10, ttl=60)
+    monkeypatch.setattr(utils, "api_keys_cache", cache)
+    cache.set("u1", ("keys", Project("p1")))
+    cache.set("u2", ("keys", Project("p1")))
+    cache.set("u3", ("keys", Project("p2")))
+    return cache
+
+
+def test_orm_writes_drop_cached_api_keys(monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from models import ApiKey, Project, User
+
+    cache = _seed_api_keys_cache(monkeypatch)
+    engine = create_engine("sqlite://")
+    for model in (User, Project, ApiKey):
+        model.__table__.create(engine)
+    with Session(engine) as db:
+        db.add(User(id="u3", email="u3@example.com", password="x"))
+        db.commit()
+        assert cache.stats()["size"] == 3
+        db.add(ApiKey(key="k", service="slack", projectId="p1"))
+        db.commit()
+        assert (cache.get("u1", None), cache.get("u2", None)) == (None, None)
+        assert cache.get("u3", None) is not None
+        db.get(User, "u3").name = "renamed"
+        db.commit()
+        assert cache.get("u3", None) is None
+
+
+def test_api_keys_notification(monkeypatch):
+    import utils
+
+    cache = _seed_api_keys_cache(monkeypatch)
+    utils.on_api_keys_notification('{"project_id": "p1"}')
+    assert cache.stats()["size"] == 1
+    utils.on_api_keys_notification('{"user_id": "u3"}')
+    assert cache.stats()["size"] == 0
+    cache.set("u1", ("keys", None))
+    utils.on_api_keys_notification("not json")
+    assert cache.stats()["size"] == 0
+
+
+def test_invalidate_api_keys_endpoint(monkeypatch):
+    import os
+    os.environ.setdefault("OPENAI_API_KEY", "test")
+    import auth
+    from fastapi.testclient import TestClient
+    from main import app
+
+    cache = _seed_api_keys_cache(monkeypatch)
+    monkeypatch.setattr(auth, "INTERNAL_API_TOKEN", "s3cret")
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer s3cret"}
+    assert client.post("/internal/invalidate_api_keys?project_id=p1").status_code == 401
+    assert client.post("/internal/invalidate_api_keys", headers=headers).status_code == 422
+    assert client.post("/internal/invalidate_api_keys?project_id=p1", headers=headers).status_code == 200
+    assert cache.stats()["size"] == 1
@@ -0,0 +1,117 @@
+import os
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+
+import pytest
+
+import checkpoints
+
+# Set to a throwaway Postgres database (SQLAlchemy URL, e.g. postgresql+psycopg://...)
+# to run the compaction SQL against real LangGraph checkpoints.
+TEST_POSTGRES_URI = os.environ.get("TEST_POSTGRES_URI")
+
+
+def test_released_versions_come_from_deleted_checkpoints_only():
+    rows = [
+        SimpleNamespace(checkpoint_ns="", versions={"messages": "00002.0.1", "__start__": "00001.0.5"}),
+        SimpleNamespace(checkpoint_ns="", versions={"messages": "00003.0.2", "__start__": "00001.0.5"}),
+        SimpleNamespace(checkpoint_ns="sub", versions={"messages": 4}),
+        SimpleNamespace(checkpoint_ns="", versions=None),
+    ]
+    assert checkpoints.released_versions(rows) == [
+        {"checkpoint_ns": "", "channel": "__start__", "version": "00001.0.5"},
+        {"checkpoint_ns": "", "channel": "messages", "version": "00002.0.1"},
+        {"checkpoint_ns": "", "channel": "messages", "version": "00003.0.2"},
+        {"checkpoint_ns": "sub", "channel": "messages", "version": "4"},
+    ]
+
+
+def test_stats_never_expose_thread_ids(monkeypatch):
+    class Conn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, statement, params=None):
+            if statement is checkpoints.STORAGE_TOTALS:
+                return SimpleNamespace(one=lambda: SimpleNamespace(threads=1, checkpoints=3, bytes=100))
+            assert params == {"top": checkpoints.CHECKPOINT_STATS_TOP}
+            return SimpleNamespace(fetchall=lambda: [SimpleNamespace(thread_id="secret-session-token", checkpoints=3, bytes=100)])
+
+    monkeypatch.setattr(checkpoints, "engine", SimpleNamespace(connect=Conn))
+    monkeypatch.setattr(checkpoints, "_stats", {"at": -1e9, "value": {}})
+    stats = checkpoints.storage_stats()
+    assert stats["threads"] == 1 and stats["largest_threads"][0]["thread"] == checkpoints.thread_hash("secret-session-token")
+    assert "secret-session-token" not in repr(stats)
+
+
+@pytest.fixture
+def postgres(monkeypatch):
+    if not TEST_POSTGRES_URI:
+        pytest.skip("TEST_POSTGRES_URI not set")
+    from langgraph.checkpoint.postgres import PostgresSaver
+    from psycopg.rows import dict_row
+    from sqlalchemy import create_engine, make_url
+    engine = create_engine(TEST_POSTGRES_URI)
+    monkeypatch.setattr(checkpoints, "engine", engine)
+    conn_string = make_url(TEST_POSTGRES_URI).set(drivername="postgresql").render_as_string(hide_password=False)
+    with PostgresSaver.from_conn_string(conn_string) as saver:
+        saver.setup()
+        yield engine, saver
+    checkpoints.purge_prefix("test-")
+    engine.dispose()
+
+
+def run_turns(saver, thread_id, turns):
+    from langchain_core.messages import AIMessage
+    from langgraph.graph import START, MessagesState, StateGraph
+    workflow = StateGraph(MessagesState)
+    workflow.add_node("agent", lambda state: {"messages": [AIMessage(f"reply {len(state['messages'])}")]})
+    workflow.add_edge(START, "agent")
+    graph = workflow.compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": thread_id}}
+    for i in range(turns):
+        graph.invoke({"messages": [("user", f"turn {i}")]}, config)
+    return graph, config
+
+
+def test_compact_keeps_latest_checkpoints_and_their_blobs(postgres):
+    from sqlalchemy import text
+    engine, saver = postgres
+    graph, config = run_turns(saver, "test-compact", 10)
+    before = graph.get_state(config).values["messages"]
+    with engine.begin() as conn:
+        # a blob committed ahead of its checkpoint row, as the saver's pipeline does
+        conn.execute(text("INSERT INTO checkpoint_blobs (thread_id, checkpoint_ns, channel, version, type, blob) "
+                          "VALUES ('test-compact', '', 'messages', '99999.0.in-flight', 'empty', NULL)"))
+
+    deleted = checkpoints.compact_thread("test-compact", keep=3)
+    assert deleted["checkpoints"] > 0 and deleted["blobs"] > 0
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM checkpoints WHERE thread_id = 'test-compact'")).scalar() == 3
+        missing = conn.execute(text("""
+            SELECT count(*) FROM checkpoints c, jsonb_each_text(c.checkpoint -> 'channel_versions') v
+            WHERE c.thread_id = 'test-compact' AND NOT EXISTS (
+                SELECT 1 FROM checkpoint_blobs b WHERE b.thread_id = c.thread_id AND b.checkpoint_ns = c.checkpoint_ns
+                  AND b.channel = v.key AND b.version = v.value)
+        """)).scalar()
+        in_flight = conn.execute(text("SELECT count(*) FROM checkpoint_blobs WHERE version = '99999.0.in-flight'")).scalar()
+    assert missing == 0
+    assert in_flight == 1
+    assert graph.get_state(config).values["messages"] == before
+    assert checkpoints.compact_thread("test-compact", keep=3)["checkpoints"] == 0
+
+
+def test_purge_prefix_removes_whole_threads(postgres):
+    from sqlalchemy import text
+    engine, saver = postgres
+    run_turns(saver, "test-purge-1", 2)
+    run_turns(saver, "test-keep", 2)
+    assert checkpoints.purge_prefix("test-purge-") > 0
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT DISTINCT thread_id FROM checkpoints WHERE starts_with(thread_id, 'test-')")).fetchall()
+    assert [row.thread_id for row in rows] == ["test-keep"]
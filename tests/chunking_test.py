@@ -0,0 +1,46 @@
+from chunking import chunk_segments, split_long
+from tokens import approx_tokens
+from models import TranscriptSegment
+from transcripts import caption_line, to_segment
+
+
+def segment(i, speaker, text):
+    return TranscriptSegment(speaker_name=speaker, speaker_uuid=speaker, speaker_user_uuid=None,
+                             timestamp_ms=i * 1000, duration_ms=900, transcription=text)
+
+
+def test_to_segment_skips_empty():
+    raw = {"speaker_name": "Alice", "speaker_uuid": "a", "timestamp_ms": 0, "duration_ms": 10, "transcription": None}
+    assert to_segment(raw) is None
+    raw["transcription"] = {"transcript": "hi"}
+    assert to_segment(raw).transcription == "hi"
+
+
+def test_packs_whole_utterances_with_metadata():
+    segments = [segment(i, "Alice" if i % 2 else "Bob", f"utterance number {i} " * 5) for i in range(30)]
+    chunks = chunk_segments(segments, {"meeting_id": "m1"}, max_tokens=100)
+    assert len(chunks) > 1
+    lines = [line for chunk in chunks for line in chunk.page_content.splitlines(keepends=True)]
+    assert lines == [caption_line(s) for s in segments]
+    for chunk in chunks:
+        assert approx_tokens(chunk.page_content) <= 100
+        assert chunk.metadata["meeting_id"] == "m1"
+        assert set(chunk.metadata["speakers"]) <= {"Alice", "Bob"}
+        assert chunk.metadata["start_ms"] < chunk.metadata["end_ms"]
+    assert chunks[0].metadata["start_ms"] == 0 and chunks[-1].metadata["end_ms"] == 29 * 1000 + 900
+
+
+def test_long_utterance_split_at_sentences():
+    long = segment(0, "Alice", "This is a sentence. " * 100)
+    pieces = split_long(long, 50)
+    assert len(pieces) > 1
+    assert all(approx_tokens(caption_line(p)) <= 50 for p in pieces)
+    assert all(p.transcription.endswith(".") for p in pieces)
+    assert " ".join(p.transcription for p in pieces) == long.transcription.strip()
+
+
+def test_overlap_carries_last_utterance():
+    segments = [segment(i, "Bob", f"line {i} " * 10) for i in range(10)]
+    chunks = chunk_segments(segments, {}, max_tokens=60, overlap=1)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.page_content.splitlines()[-1] == chunk.page_content.splitlines()[0]
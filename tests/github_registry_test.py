@@ -0,0 +1,80 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from custom_tools import github_registry
+
+
+class FakeIntegration:
+    def __init__(self, auth=None):
+        self.installation_lookups = 0
+        self.tokens = 0
+        self.expires_in = timedelta(hours=1)
+
+    def get_repo_installation(self, owner, name):
+        self.installation_lookups += 1
+        time.sleep(0.05)
+        return SimpleNamespace(id=42)
+
+    def get_access_token(self, installation_id):
+        self.tokens += 1
+        return SimpleNamespace(token=f"token-{self.tokens}", expires_at=datetime.now(timezone.utc) + self.expires_in)
+
+
+class FakeGithub:
+    repo_fetches = 0
+
+    def __init__(self, auth=None):
+        self.auth = auth
+
+    def get_repo(self, name):
+        FakeGithub.repo_fetches += 1
+        return SimpleNamespace(full_name=name)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(github_registry, "GithubIntegration", FakeIntegration)
+    monkeypatch.setattr(github_registry, "Github", FakeGithub)
+    FakeGithub.repo_fetches = 0
+    return github_registry.GitHubAppRegistry("1", "private-key")
+
+
+def test_first_get_connects_once(registry):
+    entry = registry.get("octo/repo")
+    assert entry.repo.full_name == "octo/repo"
+    assert (registry.integration.installation_lookups, registry.integration.tokens, FakeGithub.repo_fetches) == (1, 1, 1)
+
+
+def test_concurrent_gets_share_one_entry(registry):
+    entries = []
+    threads = [threading.Thread(target=lambda: entries.append(registry.get("octo/repo"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(entries) == 8
+    assert all(entry is entries[0] for entry in entries)
+    assert registry.integration.installation_lookups == 1
+    assert FakeGithub.repo_fetches == 1
+
+
+def test_warm_get_makes_no_github_call(registry):
+    first = registry.get("octo/repo")
+    assert registry.get("octo/repo") is first
+    assert first.auth.token == "token-1"
+    assert (registry.integration.installation_lookups, registry.integration.tokens, FakeGithub.repo_fetches) == (1, 1, 1)
+
+
+def test_token_near_expiry_is_refreshed(registry):
+    registry.integration.expires_in = github_registry.GITHUB_TOKEN_REFRESH_MARGIN - timedelta(seconds=1)
+    entry = registry.get("octo/repo")
+    assert registry.integration.tokens == 1
+    registry.integration.expires_in = timedelta(hours=1)
+    assert registry.get("octo/repo") is entry
+    assert registry.integration.tokens == 2
+    assert entry.auth.token == "token-2"
+    assert registry.integration.installation_lookups == 1
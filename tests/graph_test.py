@@ -0,0 +1,31 @@
+import os
+from datetime import datetime, timezone
+
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import graph
+from models import ApiKeys, Project
+
+
+class Clock:
+    now_value = datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.now_value
+
+
+def test_system_context_is_built_per_turn(monkeypatch):
+    monkeypatch.setattr(graph, "datetime", Clock)
+    config = {"configurable": {"__api_keys": ApiKeys(JIRA_PROJECT="SW"), "project": Project(name="Sync", description="d")}}
+    first = graph.get_system_context(config)[0].content
+    Clock.now_value = datetime(2026, 1, 1, 17, 30, tzinfo=timezone.utc)
+    second = graph.get_system_context(config)[0].content
+    assert "2026-01-01 09:00:00" in first and "2026-01-01 17:30:00" in second
+    assert "`SW`" in second
+
+
+def test_explicit_system_context_wins():
+    config = {"configurable": {"project": Project(name="Sync"), "system_context": "Jira Project key: `SW`"}}
+    assert [m.content for m in graph.get_system_context(config)] == ["Jira Project key: `SW`"]
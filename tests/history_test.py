@@ -0,0 +1,55 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+import history
+from history import condense_tool_payloads, plan_window, split_turns, with_summary
+
+
+def make_turn(i, payload=""):
+    return [
+        HumanMessage(f"question {i}", id=f"h{i}"),
+        AIMessage("", id=f"a{i}", tool_calls=[{"name": "jql_query", "args": {"query": str(i)}, "id": f"c{i}"}]),
+        ToolMessage(payload or f"result {i}", tool_call_id=f"c{i}", name="jql_query", id=f"t{i}"),
+        AIMessage(f"answer {i}", id=f"r{i}"),
+    ]
+
+
+def test_split_turns():
+    messages = make_turn(0) + make_turn(1)
+    turns = split_turns(messages)
+    assert [turn[0].id for turn in turns] == ["h0", "h1"]
+    assert all(len(turn) == 4 for turn in turns)
+
+
+def test_condense_tool_payloads_keeps_ids():
+    message = ToolMessage("x" * 50, tool_call_id="c0", name="jql_query", id="t0")
+    condensed, = condense_tool_payloads([message], limit=10)
+    assert condensed.id == "t0" and condensed.tool_call_id == "c0"
+    assert condensed.content.startswith("x" * 10) and "40 more characters" in condensed.content
+
+
+def test_short_history_is_sent_verbatim():
+    messages = make_turn(0) + make_turn(1)
+    window = plan_window(messages)
+    assert window.to_fold == []
+    assert [m.id for m in window.messages] == [m.id for m in messages]
+
+
+def test_long_history_folds_old_turns(monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_MAX_TOKENS", 200)
+    monkeypatch.setattr(history, "HISTORY_KEEP_TURNS", 2)
+    messages = [m for i in range(6) for m in make_turn(i, "y" * 400)]
+    window = plan_window(messages)
+    assert window.to_fold[-1].id == "r3"
+    assert window.messages[0].id == "h4"
+    # tool output of the current turn stays untouched
+    assert window.messages[-2].content == "y" * 400
+
+    window = plan_window(messages, summarized_until="r3")
+    assert window.to_fold == [] and window.messages[0].id == "h4"
+
+
+def test_with_summary():
+    messages = make_turn(0)
+    assert with_summary(None, messages) == messages
+    first = with_summary("earlier", messages)[0]
+    assert isinstance(first, SystemMessage) and "earlier" in first.content
@@ -0,0 +1,64 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from idempotency import session_lock
+from main import add_meeting_transcript
+from models import Base, Job, Meeting, WebhookPayload
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Meeting(userId="u1", projectId="p1", meeting_id="m1", bot_id="bot1", bot_data={"stages": {"index": {"status": "done"}}}))
+    db.commit()
+    yield db
+    db.close()
+
+
+def webhook(key, state):
+    return WebhookPayload(
+        idempotency_key=key,
+        bot_id="bot1",
+        trigger="bot.state_change",
+        data={"new_state": state, "old_state": "joined", "created_at": datetime.now(timezone.utc), "event_type": "state"},
+    )
+
+
+def test_replay_by_key_returns_stored_response(session):
+    first = add_meeting_transcript(webhook("k1", "ended"), session)
+    assert first["job_id"]
+    assert add_meeting_transcript(webhook("k1", "ended"), session) == first
+    assert session.query(Job).count() == 1
+
+
+def test_second_ended_with_new_key_is_deduped(session):
+    first = add_meeting_transcript(webhook("k1", "ended"), session)
+    assert add_meeting_transcript(webhook("k2", "ended"), session) == first
+    assert session.query(Job).count() == 1
+
+
+def test_other_states_with_new_key_are_processed(session):
+    add_meeting_transcript(webhook("k1", "joined_recording"), session)
+    response = add_meeting_transcript(webhook("k2", "post_processing"), session)
+    assert response == {"success": True}
+    meeting = session.query(Meeting).one()
+    # the state is merged into bot_data, the worker's stage statuses stay
+    assert meeting.bot_data == {"stages": {"index": {"status": "done"}}, "state": "post_processing"}
+    assert session.query(Job).count() == 0
+
+
+def test_session_lock_without_postgres_is_a_no_op():
+    async def run():
+        async with session_lock("meeting:m1") as acquired:
+            return acquired
+    assert asyncio.run(run())
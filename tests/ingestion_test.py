@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+
+from langchain_core.documents import Document
+
+from ingestion import assign_ids, index_chunks, index_meeting
+
+
+class FakeEmbeddings:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return [[float(len(text))] for text in texts]
+
+
+class FakeIndex:
+    def __init__(self):
+        self.vectors = []
+        self.stored = {}
+
+    def upsert(self, vectors):
+        self.vectors.extend(vectors)
+        self.stored.update({v["id"]: v for v in vectors})
+
+    def list(self, prefix):
+        yield [vector_id for vector_id in self.stored if vector_id.startswith(prefix)]
+
+    def delete(self, ids):
+        for vector_id in ids:
+            del self.stored[vector_id]
+
+
+class MemoryCache:
+    def __init__(self):
+        self.rows = {}
+
+    def get_many(self, model, hashes):
+        return {h: self.rows[(model, h)] for h in hashes if (model, h) in self.rows}
+
+    def put_many(self, model, vectors):
+        self.rows.update({(model, h): v for h, v in vectors.items()})
+
+
+def chunks(n, meeting_id=None):
+    docs = [Document(page_content=f"chunk {i}", metadata={"meeting_id": "m1"}) for i in range(n)]
+    return assign_ids(meeting_id or "m1", docs)
+
+
+def test_all_chunks_upserted_with_text_metadata():
+    index = FakeIndex()
+    stats = index_chunks(index, FakeEmbeddings(), chunks(25), batch_size=4, concurrency=2)
+    assert stats["chunks"] == 25 and stats["batches"] == 7
+    assert [v["metadata"]["text"] for v in index.vectors] == [f"chunk {i}" for i in range(25)]
+    assert all(v["metadata"]["meeting_id"] == "m1" for v in index.vectors)
+
+
+def test_embedding_concurrency_is_bounded():
+    embeddings = FakeEmbeddings(delay=0.05)
+    start = time.perf_counter()
+    index_chunks(FakeIndex(), embeddings, chunks(40), batch_size=5, concurrency=4)
+    assert embeddings.peak <= 4
+    assert time.perf_counter() - start < 8 * 0.05
+
+
+def test_reindexing_overwrites_and_reuses_embeddings():
+    index, cache = FakeIndex(), MemoryCache()
+    embeddings = FakeEmbeddings()
+    calls = []
+    embeddings.embed_documents = lambda texts, embed=embeddings.embed_documents: calls.append(len(texts)) or embed(texts)
+
+    docs = [Document(page_content=f"chunk {i}") for i in range(10)]
+    index_meeting(index, embeddings, "m1", docs, cache=cache)
+    assert sum(calls) == 10 and len(index.stored) == 10
+    assert all(vector_id.startswith("m1#") for vector_id in index.stored)
+
+    calls.clear()
+    stats = index_meeting(index, embeddings, "m1", [Document(page_content=f"chunk {i}") for i in range(10)], cache=cache)
+    assert calls == [] and len(index.stored) == 10 and stats["stale_deleted"] == 0
+
+    stats = index_meeting(index, embeddings, "m1", [Document(page_content=f"chunk {i}") for i in range(6)], cache=cache)
+    assert calls == [] and len(index.stored) == 6 and stats["stale_deleted"] == 4
@@ -0,0 +1,90 @@
+import os
+from datetime import timedelta
+
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import jobs
+from models import Job
+
+
+@pytest.fixture
+def Session(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Job.__table__.create(engine)
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(jobs, "SessionLocal", Session)
+    return Session
+
+
+def load(Session, job_id):
+    db = Session()
+    try:
+        return db.get(Job, job_id)
+    finally:
+        db.close()
+
+
+def enqueue(Session, **kwargs):
+    db = Session()
+    try:
+        return jobs.enqueue(db, "meeting.ended", {"meeting_id": "m1"}, **kwargs).id
+    finally:
+        db.close()
+
+
+def test_enqueue_claim_complete(Session):
+    job_id = enqueue(Session)
+    job = jobs.claim("w1")
+    assert job.id == job_id and job.attempts == 1 and job.locked_by == "w1"
+    assert jobs.claim("w2") is None
+    assert jobs.complete(job, "w1", {"index": 12.5})
+    done = load(Session, job_id)
+    assert done.status == "done" and done.locked_by is None and done.stages == {"index": 12.5}
+    # only the lease holder may finish a job
+    assert not jobs.complete(job, "w2", {})
+
+
+def test_fail_requeues_with_backoff_then_fails(Session):
+    job_id = enqueue(Session, max_attempts=2)
+    job = jobs.claim("w1")
+    before = jobs.utcnow()
+    assert jobs.fail(job, "w1", "boom", {})
+    queued = load(Session, job_id)
+    assert queued.status == "queued" and queued.last_error == "boom"
+    assert queued.run_at.replace(tzinfo=None) >= (before + timedelta(seconds=jobs.JOB_RETRY_BASE_DELAY * 0.5)).replace(tzinfo=None)
+    assert jobs.claim("w1") is None  # not before the backoff
+
+    db = Session()
+    db.get(Job, job_id).run_at = jobs.utcnow() - timedelta(seconds=1)
+    db.commit()
+    db.close()
+    job = jobs.claim("w1")
+    assert job.attempts == 2
+    assert jobs.fail(job, "w1", "boom again", {})
+    assert load(Session, job_id).status == "failed"
+
+
+def test_expired_lease_on_last_attempt_fails(Session):
+    job_id = enqueue(Session, max_attempts=1)
+    jobs.claim("w1")
+    db = Session()
+    db.get(Job, job_id).locked_until = jobs.utcnow() - timedelta(seconds=1)
+    db.commit()
+    db.close()
+    # the worker died, the job must not be leased again
+    assert jobs.claim("w2") is None
+    failed = load(Session, job_id)
+    assert failed.status == "failed" and failed.last_error == "lease expired" and failed.attempts == 1
+
+
+def test_retry_delay_bounds():
+    for attempts in range(1, 20):
+        delay = jobs.retry_delay(attempts)
+        full = min(jobs.JOB_RETRY_MAX_DELAY, jobs.JOB_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+        assert full / 2 <= delay <= full
+    assert jobs.retry_delay(50) <= jobs.JOB_RETRY_MAX_DELAY
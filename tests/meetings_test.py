@@ -0,0 +1,64 @@
+import os
+import threading
+
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import pytest
+
+import meetings
+from jobs import collect_stages
+from meetings import Item, add_meeting_to_db
+
+
+@pytest.fixture
+def statuses(monkeypatch):
+    saved = {}
+    monkeypatch.setattr(meetings, "set_stage_status", lambda meeting_id, name, status, error=None: saved.__setitem__(name, status))
+    monkeypatch.setattr(meetings, "stage_statuses", lambda meeting_id: {name: {"status": s} for name, s in saved.items()})
+    return saved
+
+
+def item():
+    return Item(user_id="u1", meeting_id="m1", caption="[Alice]: hi\n")
+
+
+def test_stages_run_concurrently(monkeypatch, statuses):
+    started = threading.Barrier(3, timeout=5)
+    monkeypatch.setattr(meetings, "MEETING_STAGES", {name: lambda item: started.wait() and None for name in ("index", "tasks", "summary")})
+    with collect_stages() as stages:
+        add_meeting_to_db(item())
+    assert statuses == {"index": "done", "tasks": "done", "summary": "done"}
+    assert set(stages) == {"index", "tasks", "summary"}
+
+
+def test_retry_only_reruns_failed_stages(monkeypatch, statuses):
+    calls = []
+
+    def failing(name, fail):
+        def run(item):
+            calls.append(name)
+            if fail:
+                raise RuntimeError(f"{name} broke")
+        return run
+
+    monkeypatch.setattr(meetings, "MEETING_STAGES", {"index": failing("index", False), "tasks": failing("tasks", True), "summary": failing("summary", True)})
+    with pytest.raises(RuntimeError, match="summary broke"):
+        add_meeting_to_db(item())
+    assert statuses == {"index": "done", "tasks": "failed", "summary": "failed"}
+
+    calls.clear()
+    monkeypatch.setattr(meetings, "MEETING_STAGES", {"index": failing("index", False), "tasks": failing("tasks", False), "summary": failing("summary", False)})
+    add_meeting_to_db(item())
+    # tasks is not retried, it may have created Jira issues before failing
+    assert calls == ["summary"]
+    assert statuses["summary"] == "done"
+
+
+def test_no_retry_stage_left_running_is_not_rerun(monkeypatch, statuses):
+    calls = []
+    monkeypatch.setattr(meetings, "MEETING_STAGES", {name: (lambda name: lambda item: calls.append(name))(name) for name in ("index", "tasks", "summary")})
+    statuses.update(index="running", tasks="running")
+    add_meeting_to_db(item())
+    assert sorted(calls) == ["index", "summary"]
+    assert statuses["tasks"] == "failed"
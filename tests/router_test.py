@@ -0,0 +1,36 @@
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import llm
+import metrics
+from llm import ModelRouter, TurnFeatures, default_policy, turn_features
+
+
+def test_followup_and_tool_summaries_use_fast_model():
+    assert default_policy(turn_features([HumanMessage("thanks!")])) == "fast"
+    messages = [
+        HumanMessage("list my jira issues"),
+        AIMessage("", tool_calls=[{"name": "jql_query", "args": {}, "id": "c1"}]),
+        ToolMessage("[]", tool_call_id="c1"),
+    ]
+    assert default_policy(turn_features(messages)) == "fast"
+
+
+def test_tool_intent_long_history_and_internal_runs_use_strong_model(monkeypatch):
+    assert default_policy(turn_features([HumanMessage("create an issue for the login bug")])) == "strong"
+    assert default_policy(turn_features([HumanMessage("hi")], request_type="meeting_tasks")) == "strong"
+    monkeypatch.setattr(llm, "LLM_STRONG_HISTORY_TOKENS", 10)
+    assert default_policy(turn_features([HumanMessage("hello " * 50)])) == "strong"
+
+
+def test_pluggable_policy_and_unknown_route():
+    router = ModelRouter(routes={"fast": "small", "strong": "big"}, policy=lambda features: "strong")
+    features = TurnFeatures("chat", 0, 0, False, False)
+    assert router.model(router.route(features)) == "big"
+    router = ModelRouter(routes={"fast": "small"}, policy=lambda features: "nope")
+    before = metrics.snapshot()["counters"].get("llm.route.unknown", 0)
+    assert router.route(features) == "fast"
+    assert metrics.snapshot()["counters"]["llm.route.unknown"] == before + 1
@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessageChunk, ToolMessage
+
+from streaming import (
+    CompactProtocol,
+    DeltaCoalescer,
+    LegacyProtocol,
+    SendQueue,
+    SlowConsumerError,
+    event_frames,
+    make_protocol,
+)
+
+META = {"langgraph_node": "agent"}
+
+def test_text_chunk_is_a_delta_frame():
+    frames = event_frames((AIMessageChunk(content="Hel", id="m1"), META))
+    assert frames == [{"v": 1, "t": "d", "id": "m1", "d": "Hel"}]
+
+def test_tool_call_and_result_keep_envelopes():
+    chunk = AIMessageChunk(content="", id="m1", tool_call_chunks=[{"name": "get_issues", "args": "{}", "id": "c1", "index": 0}])
+    (call,) = event_frames((chunk, META))
+    assert call["t"] == "tool_call"
+    assert call["calls"] == [{"id": "c1", "name": "get_issues", "args": "{}", "index": 0}]
+
+    result = ToolMessage(content="[]", name="get_issues", tool_call_id="c1", id="t1")
+    (frame,) = event_frames((result, {"langgraph_node": "tools"}))
+    assert frame["t"] == "tool_result"
+    assert frame["tool_call_id"] == "c1"
+    assert frame["n"] == "tools"
+
+def test_coalescer_merges_by_size_and_message():
+    coalescer = DeltaCoalescer(max_bytes=5)
+    delta = lambda i, d: {"v": 1, "t": "d", "id": i, "d": d}
+    assert coalescer.push(delta("m1", "ab")) == []
+    assert coalescer.push(delta("m1", "cde")) == [delta("m1", "abcde")]
+    assert coalescer.push(delta("m1", "f")) == []
+    # a new message id releases the pending delta of the previous one
+    assert coalescer.push(delta("m2", "g")) == [delta("m1", "f")]
+    # any non-delta frame flushes first and keeps ordering
+    end = {"v": 1, "t": "end"}
+    assert coalescer.push(end) == [delta("m2", "g"), end]
+    assert coalescer.flush() == []
+
+def test_coalescing_disabled_passes_through():
+    coalescer = DeltaCoalescer()
+    frame = {"v": 1, "t": "d", "id": "m1", "d": "a"}
+    assert coalescer.push(frame) == [frame]
+
+def test_protocols():
+    assert isinstance(make_protocol("legacy"), LegacyProtocol)
+    compact = make_protocol("compact", coalesce_ms=0, coalesce_bytes=0)
+    assert isinstance(compact, CompactProtocol)
+    (frame,) = compact.frames((AIMessageChunk(content="é", id="m1"), META))
+    assert json.loads(compact.serialize(frame)) == {"v": 1, "t": "d", "id": "m1", "d": "é"}
+    assert json.loads(compact.serialize(compact.control("end"))) == {"v": 1, "t": "end"}
+    assert json.loads(LegacyProtocol().control("end")) == {"type": "end"}
+
+class FakeWebSocket:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed = None
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000, reason=None):
+        self.closed = code
+
+def delta(i, d):
+    return {"v": 1, "t": "d", "id": i, "d": d}
+
+@pytest.mark.asyncio
+async def test_send_queue_coalesces_unsent_deltas():
+    ws = FakeWebSocket(delay=0.01)
+    queue = SendQueue(ws, CompactProtocol(), maxsize=2, policy="coalesce").start()
+    for c in "abcdef":
+        await queue.put(delta("m1", c))
+    await queue.put({"v": 1, "t": "end"})
+    await queue.drain()
+    assert "".join(f["d"] for f in ws.sent if f["t"] == "d") == "abcdef"
+    assert len(ws.sent) < 7
+    assert ws.sent[-1] == {"v": 1, "t": "end"}
+
+@pytest.mark.asyncio
+async def test_send_queue_drop_policy_keeps_control_frames():
+    ws = FakeWebSocket(delay=0.01)
+    queue = SendQueue(ws, CompactProtocol(), maxsize=1, policy="drop").start()
+    for c in "abcdef":
+        await queue.put(delta(c, c))
+    await queue.put({"v": 1, "t": "end"})
+    await queue.drain()
+    assert ws.sent[-1] == {"v": 1, "t": "end"}
+    assert len(ws.sent) < 7
+
+@pytest.mark.asyncio
+async def test_send_queue_disconnect_policy():
+    ws = FakeWebSocket(delay=1)
+    queue = SendQueue(ws, CompactProtocol(), maxsize=1, policy="disconnect").start()
+    with pytest.raises(SlowConsumerError):
+        for c in "abc":
+            await queue.put(delta(c, c))
+    assert ws.closed == 1013
+    queue.cancel()
+
+@pytest.mark.asyncio
+async def test_send_queue_releases_time_coalesced_text():
+    ws = FakeWebSocket()
+    protocol = CompactProtocol(coalesce_ms=20)
+    queue = SendQueue(ws, protocol).start()
+    await queue.put_all(protocol.frames((AIMessageChunk(content="Hi", id="m1"), META)))
+    await asyncio.sleep(0.01)
+    assert ws.sent == []
+    await asyncio.sleep(0.05)
+    assert ws.sent == [delta("m1", "Hi")]
+    await queue.drain()
@@ -0,0 +1,75 @@
+import os
+import threading
+
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from summarization import groups, sections, summarize
+
+
+class FakeLlm:
+    model_name = "fake"
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.prompts = []
+        self.lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self.lock:
+            self.prompts.append(prompt)
+        if self.fail_on and self.fail_on in prompt:
+            raise RuntimeError("model unavailable")
+        return AIMessage(content=f"summary {len(prompt)}")
+
+
+class MemoryCache:
+    def __init__(self):
+        self.rows = {}
+
+    def get_many(self, meeting_id, hashes):
+        return {h: self.rows[(meeting_id, h)] for h in hashes if (meeting_id, h) in self.rows}
+
+    def put(self, meeting_id, key, summary):
+        self.rows[(meeting_id, key)] = summary
+
+
+def transcript(lines):
+    return "".join(f"[Speaker {i % 3}]: we talked about item number {i} for a while\n" for i in range(lines))
+
+
+def test_short_transcript_is_one_call():
+    llm = FakeLlm()
+    summarize(llm, "m1", transcript(10), cache=MemoryCache(), section_tokens=1000)
+    assert len(llm.prompts) == 1
+
+
+def test_sections_keep_whole_lines():
+    text = transcript(200)
+    parts = sections(text, 300)
+    assert len(parts) > 1
+    assert all(part.startswith("[Speaker") for part in parts)
+
+
+def test_groups_always_shrink():
+    packed = groups(["x" * 4000] * 5, 100)
+    assert [len(group) for group in packed] == [2, 3]
+
+
+def test_map_reduce_and_resume():
+    text = transcript(400)
+    parts = sections(text, 500)
+    cache = MemoryCache()
+    failing = FakeLlm(fail_on=f"part 3 of {len(parts)}")
+    with pytest.raises(RuntimeError):
+        summarize(failing, "m1", text, cache=cache, section_tokens=500)
+    assert len(failing.prompts) == len(parts)
+
+    llm = FakeLlm()
+    summary = summarize(llm, "m1", text, cache=cache, section_tokens=500)
+    assert summary.startswith("summary")
+    # only the failed section and the combine step are new calls
+    assert len(llm.prompts) == 2
+    assert "part 3 of" in llm.prompts[0]
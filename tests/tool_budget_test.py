@@ -0,0 +1,52 @@
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import tool_budget
+from tool_budget import budget_tool_results, fit, pending_results
+
+
+class FakeSummarizer:
+    def invoke(self, prompt):
+        return AIMessage("short summary")
+
+
+def tool_message(name, content, id):
+    return ToolMessage(content, name=name, tool_call_id=f"call-{id}", id=id)
+
+
+def test_small_results_are_left_alone():
+    assert fit(tool_message("list_files", "a.py\nb.py", "t1"), 100) is None
+
+
+def test_projects_then_truncates_json_lists():
+    meetings = [{"meeting_id": str(i), "name": f"m{i}", "summary": "x" * 400, "tasks": ["t"] * 20} for i in range(20)]
+    content = fit(tool_message("retrieve_or_list_meetings", json.dumps(meetings), "t1"), 250)
+    kept = json.loads(content)
+    assert kept == [{"meeting_id": str(i), "name": f"m{i}"} for i in range(20)]
+
+    content = fit(tool_message("retrieve_or_list_meetings", json.dumps(meetings), "t1"), 40)
+    head, note = content.split("\n")
+    assert len(json.loads(head)) < 20 and "of 20 items" in note
+
+
+def test_truncates_text():
+    content = fit(tool_message("search_code", "y" * 10000, "t1"), 100)
+    assert content.startswith("y" * 400) and "more tokens omitted" in content
+
+
+def test_node_replaces_only_current_results_by_id(monkeypatch):
+    monkeypatch.setattr(tool_budget, "TOOL_RESULT_TOKENS", 10)
+    messages = [
+        HumanMessage("q", id="h1"),
+        AIMessage("", id="a1", tool_calls=[{"name": "old", "args": {}, "id": "call-t0"}]),
+        tool_message("old", "z" * 1000, "t0"),
+        AIMessage("", id="a2", tool_calls=[{"name": "x", "args": {}, "id": "call-t1"}, {"name": "get_messages", "args": {}, "id": "call-t2"}]),
+        tool_message("x", "z" * 1000, "t1"),
+        tool_message("get_messages", "w" * 10000, "t2"),
+    ]
+    assert [m.id for m in pending_results(messages)] == ["t1", "t2"]
+    updates = budget_tool_results({"messages": messages}, FakeSummarizer())["messages"]
+    assert [m.id for m in updates] == ["t1", "t2"]
+    assert updates[0].tool_call_id == "call-t1" and len(updates[0].content) < 200
+    assert updates[1].content == "short summary"
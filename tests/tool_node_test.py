@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+import tool_node
+from tool_node import BoundedToolNode
+
+
+@tool
+def slow_a(seconds: float) -> str:
+    """Sleep."""
+    time.sleep(seconds)
+    return "a"
+
+
+@tool
+def slow_b(seconds: float) -> str:
+    """Sleep."""
+    time.sleep(seconds)
+    return "b"
+
+
+def calls(*specs):
+    return {"messages": [AIMessage("", tool_calls=[
+        {"name": name, "args": {"seconds": seconds}, "id": f"call{i}"} for i, (name, seconds) in enumerate(specs)
+    ])]}
+
+
+def test_calls_run_concurrently_across_integrations():
+    node = BoundedToolNode([slow_a, slow_b], integrations={"slow_a": "x", "slow_b": "y"})
+    start = time.perf_counter()
+    result = asyncio.run(node.ainvoke(calls(("slow_a", 0.2), ("slow_b", 0.2))))
+    assert time.perf_counter() - start < 0.35
+    assert [m.content for m in result["messages"]] == ["a", "b"]
+
+
+def test_integration_cap_serializes(monkeypatch):
+    monkeypatch.setattr(tool_node, "TOOL_CONCURRENCY", 1)
+    node = BoundedToolNode([slow_a, slow_b], integrations={"slow_a": "x", "slow_b": "x"})
+    start = time.perf_counter()
+    node.invoke(calls(("slow_a", 0.15), ("slow_b", 0.15)))
+    assert time.perf_counter() - start >= 0.3
+
+
+def test_timeout_returns_error_message(monkeypatch):
+    monkeypatch.setattr(tool_node, "TOOL_TIMEOUT", 0.1)
+    node = BoundedToolNode([slow_a])
+    for result in (node.invoke(calls(("slow_a", 0.5))), asyncio.run(node.ainvoke(calls(("slow_a", 0.5))))):
+        message, = result["messages"]
+        assert message.status == "error" and message.tool_call_id == "call0"
+
+
+def test_timed_out_call_keeps_its_integration_slot(monkeypatch):
+    monkeypatch.setattr(tool_node, "TOOL_TIMEOUT", 0.1)
+    monkeypatch.setattr(tool_node, "TOOL_CONCURRENCY", 1)
+    node = BoundedToolNode([slow_a, slow_b], integrations={"slow_a": "x", "slow_b": "x"})
+    node.invoke(calls(("slow_a", 0.4)))
+    # slow_a is still running in its abandoned thread, so slow_b waits for it
+    start = time.perf_counter()
+    message, = node.invoke(calls(("slow_b", 0)))["messages"]
+    assert message.content == "b"
+    assert time.perf_counter() - start >= 0.2
+
+    async def run_async():
+        await node.ainvoke(calls(("slow_a", 0.6)))
+        start = time.perf_counter()
+        message, = (await node.ainvoke(calls(("slow_b", 0))))["messages"]
+        return message, time.perf_counter() - start
+
+    message, waited = asyncio.run(run_async())
+    assert message.content == "b"
+    assert waited >= 0.4
+
+
+def test_result_cache_and_write_invalidation(monkeypatch):
+    from models import ApiKeys
+    import tool_cache
+    from tool_cache import ToolResultCache
+
+    counter = {"reads": 0}
+
+    @tool
+    def get_issues(state: str = "open") -> str:
+        """List issues."""
+        counter["reads"] += 1
+        return f"issues {counter['reads']}"
+
+    @tool
+    def create_issue(title: str) -> str:
+        """Create an issue."""
+        return "created"
+
+    monkeypatch.setitem(tool_cache.TOOL_CACHE_TTLS, "get_issues", 60)
+    node = BoundedToolNode([get_issues, create_issue], integrations={"get_issues": "github", "create_issue": "github"},
+                           cache=ToolResultCache("test_tool_results"))
+    config = {"configurable": {"__api_keys": ApiKeys(user_id="u1", project_id="p1")}}
+    teammate = {"configurable": {"__api_keys": ApiKeys(user_id="u2", project_id="p1")}}
+
+    def run(name, args, config=config):
+        message = AIMessage("", tool_calls=[{"name": name, "args": args, "id": f"id-{counter['reads']}-{name}"}])
+        return node.invoke({"messages": [message]}, config)["messages"][0]
+
+    first = run("get_issues", {"state": "open"})
+    second = run("get_issues", {"state": "open"})
+    assert first.content == second.content == "issues 1"
+    assert second.tool_call_id != first.tool_call_id
+    run("create_issue", {"title": "x"})
+    assert run("get_issues", {"state": "open"}).content == "issues 2"
+    assert node.cache.cache.stats()["hits"] == 1
+    # the project shares its credentials, so a teammate's write invalidates it too
+    assert run("get_issues", {"state": "open"}, teammate).content == "issues 2"
+    run("create_issue", {"title": "y"}, teammate)
+    assert run("get_issues", {"state": "open"}).content == "issues 3"
@@ -0,0 +1,61 @@
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import pytest
+from langchain_core.tools import tool
+
+import llm
+import tools
+from models import ApiKeys
+
+
+def fake_tool(name):
+    @tool(name)
+    def run(query: str) -> str:
+        """Fake integration tool."""
+        return name
+    return run
+
+
+@pytest.fixture
+def fake_tools(monkeypatch):
+    by_integration = {
+        "jira": ["get_issues", "create_issue"],
+        "github": ["list_open_pull_requests"],
+        "slack": ["send_message"],
+        "meetings": ["retrieve_or_list_meetings"],
+    }
+    monkeypatch.setattr(tools, "tools", [])
+    monkeypatch.setattr(tools, "TOOL_INTEGRATIONS", {})
+    monkeypatch.setattr(tools, "_tools_loaded", True)
+    for integration, names in by_integration.items():
+        tools.add_tools(integration, [fake_tool(name) for name in names])
+    llm.sorted_tools.cache_clear()
+    llm.all_schema_tokens.cache_clear()
+    llm.bind_llm.cache_clear()
+    yield
+    llm.sorted_tools.cache_clear()
+    llm.all_schema_tokens.cache_clear()
+    llm.bind_llm.cache_clear()
+
+
+def bound_names(runnable):
+    return sorted(t["function"]["name"] for t in runnable.last.kwargs["tools"])
+
+
+def test_user_without_jira_or_github_keys_gets_neither(fake_tools):
+    keys = ApiKeys(user_id="u1", project_id="p1", SLACK_USER_TOKEN="xoxp", JIRA_API_TOKEN="t")
+    assert tools.enabled_integrations(keys) == {"slack", "meetings"}
+    assert tools.enabled_tool_names(keys) == {"send_message", "retrieve_or_list_meetings"}
+    assert bound_names(llm.llm_for(keys)) == ["retrieve_or_list_meetings", "send_message"]
+
+
+def test_same_tool_set_reuses_binding(fake_tools):
+    first = llm.llm_for(ApiKeys(user_id="u1", SLACK_USER_TOKEN="a"))
+    second = llm.llm_for(ApiKeys(user_id="u2", SLACK_USER_TOKEN="b"))
+    assert first is second
+    assert llm.bind_llm.cache_info().hits == 1
+    other = llm.llm_for(ApiKeys(user_id="u3", GITHUB_REPOSITORY="org/repo"))
+    assert other is not first
+    assert bound_names(other) == ["list_open_pull_requests", "retrieve_or_list_meetings"]
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from transcripts import JSONArrayStream, assemble_captions, to_segment
+
+def segment(i, text="hello"):
+    return {"speaker_name": f"S{i % 3}", "speaker_uuid": f"u{i % 3}", "timestamp_ms": i * 1000, "duration_ms": 900, "transcription": {"transcript": text}}
+
+def parse_in_chunks(body: bytes, size: int):
+    parser = JSONArrayStream()
+    items = []
+    for i in range(0, len(body), size):
+        items.extend(parser.feed(body[i:i + size]))
+    items.extend(parser.feed(b"", final=True))
+    return items
+
+@pytest.mark.parametrize("size", [1, 7, 64, 1 << 16])
+def test_stream_matches_json_loads(size):
+    segments = [segment(i, f"naïve “quotes” {{braces}} [{i}] \\ ünïcode") for i in range(50)]
+    body = json.dumps(segments, ensure_ascii=False).encode()
+    assert parse_in_chunks(body, size) == segments
+
+def test_scalars_and_empty_array():
+    assert parse_in_chunks(b" [1, 23, \"x\", null] ", 1) == [1, 23, "x", None]
+    assert parse_in_chunks(b"[]", 1) == []
+
+def test_truncated_body_raises():
+    parser = JSONArrayStream()
+    parser.feed(b'[{"a": 1}, {"b"')
+    with pytest.raises(ValueError):
+        parser.feed(b"", final=True)
+
+def test_assemble_captions_skips_empty_segments():
+    segments = [segment(0, "hi"), {"speaker_name": "S1", "transcription": None}, segment(1, "")]
+    assert assemble_captions(filter(None, map(to_segment, segments))) == "[S0]: hi\n"
+
+
+def test_iter_transcript_errors(monkeypatch):
+    import asyncio
+    import httpx
+    import transcripts
+
+    async def first(bot_id):
+        return [segment async for segment in transcripts.iter_transcript(bot_id)]
+
+    monkeypatch.delenv("ATTENDEE_APIKEY", raising=False)
+    with pytest.raises(RuntimeError):
+        asyncio.run(first("bot"))
+    monkeypatch.setenv("ATTENDEE_APIKEY", "key")
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(404, text="no such bot")))
+    monkeypatch.setattr(transcripts, "_http_client", client)
+    with pytest.raises(httpx.HTTPStatusError) as info:
+        asyncio.run(first("bot"))
+    assert info.value.response.status_code == 404
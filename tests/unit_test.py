@@ -112,3 +112,8 @@ def test_meeting_defaults_and_json_fields(session):
     # Timestamp fields are set
     assert isinstance(meet.creation_date, datetime)
     assert meet.end_date is None
+
+def test_chattoken_lookup_index(session):
+    # The websocket handshake filters on (userId, sessionToken)
+    indexes = {tuple(c.name for c in index.columns) for index in ChatToken.__table__.indexes}
+    assert ("userId", "sessionToken") in indexes
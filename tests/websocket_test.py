@@ -62,6 +62,49 @@ async def test_websocket_chat(msg="Hello"):
                 print(data[0]['kwargs']['content'], end="")
         print("***Output End***")
 
+@pytest.mark.asyncio
+async def test_websocket_persistent_session(msgs=("Hello","What did I just say?")):
+    """
+    Open WS with ?session=true and ask several questions on the same socket,
+    each answer ends with an {"type":"end"} frame.
+    """
+    db=SessionLocal()
+    user = db.query(User).filter(User.email=='test@test.com').first()
+    if user is None:
+        user=User(name="test user",email='test@test.com',password='testpass')
+        db.add(user)
+        db.commit()
+    if user.projectId is None:
+        project=Project(name="Test Project",userId=user.id)
+        db.add(project)
+        db.commit()
+        user.projectId=project.id
+        db.commit()
+
+    ct=ChatToken(userId=user.id)
+    db.add(ct)
+    db.commit()
+    uri = f"{WS_BASE}/ws/{user.id}/{ct.sessionToken}?session=true"
+
+    print(f"→ Connecting to {uri} (persistent session)")
+    async with websockets.connect(uri) as ws:
+        for msg in msgs:
+            await ws.send(msg)
+            frames=0
+            while True:
+                data = json.loads(await ws.recv())
+                if isinstance(data,dict):
+                    if data.get("type")=="end":
+                        break
+                    assert data.get("type")=="ping"
+                    continue
+                assert "langgraph_node" in data[1]
+                frames+=1
+            assert frames>0, f"No answer streamed for {msg!r}"
+        await ws.send(json.dumps({"type":"ping"}))
+        assert json.loads(await ws.recv())=={"type":"pong"}
+    print("✔ Persistent session passed")
+
 @pytest.mark.asyncio
 async def test_websocket_no_chattoken():
     db = SessionLocal()
@@ -131,6 +174,7 @@ if __name__ == "__main__":
     print("\nRunning integration tests against live server…\n")
     test_health()
     asyncio.run(test_websocket_chat())
+    asyncio.run(test_websocket_persistent_session())
     asyncio.run(test_websocket_no_chattoken())
     asyncio.run(test_websocket_invalid_chattoken())
     asyncio.run(test_websocket_no_project())
@@ -0,0 +1,5 @@
+# Same 4 characters per token as langchain's count_tokens_approximately.
+CHARS_PER_TOKEN=4
+
+def approx_tokens(text:str)->int:
+    return len(text)//CHARS_PER_TOKEN
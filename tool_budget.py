@@ -0,0 +1,124 @@
+# Tool results over their token budget (TOOL_RESULT_BUDGETS) are projected,
+# summarized or truncated in the graph state; the websocket client has already
+# received the full output.
+import json
+import os
+from typing import List,Optional
+
+from langchain_core.messages import AIMessage,BaseMessage,ToolMessage
+
+import metrics
+from tokens import CHARS_PER_TOKEN,approx_tokens
+from tool_node import env_key
+
+TOOL_RESULT_TOKENS=int(os.environ.get('TOOL_RESULT_TOKENS',2000))
+TOOL_RESULT_BUDGETS={
+    "list_files":1000,
+    "list_files_in_bot_branch":1000,
+    "get_files_from_directory":1000,
+    "search_code":3000,
+    "read_file":4000,
+    "get_messages":1500,
+    "retrieve_or_list_meetings":2500,
+}
+# Fields kept when a JSON list result has to be projected.
+TOOL_RESULT_FIELDS={"retrieve_or_list_meetings":("meeting_id","name","created","ended","attendees","bot_status")}
+TOOL_RESULT_SUMMARIZE=[t for t in os.environ.get('TOOL_RESULT_SUMMARIZE','get_messages').split(',') if t]
+
+SUMMARY_PROMPT="""Condense this output of the `{tool}` tool to at most {words} words. Keep every identifier, name, date, number and link that could matter for the conversation; drop repetition and boilerplate. Reply with the condensed output only.
+
+{content}"""
+
+def result_budget(tool_name:str)->int:
+    return int(os.environ.get(f'TOOL_RESULT_BUDGET_{env_key(tool_name)}',TOOL_RESULT_BUDGETS.get(tool_name,TOOL_RESULT_TOKENS)))
+
+def content_text(message:ToolMessage)->str:
+    if isinstance(message.content,str):
+        return message.content
+    return json.dumps(message.content,ensure_ascii=False,default=str)
+
+def project(tool_name:str,data):
+    fields=TOOL_RESULT_FIELDS.get(tool_name)
+    if not fields or not isinstance(data,list) or not all(isinstance(item,dict) for item in data):
+        return None
+    return [{k:v for k,v in item.items() if k in fields} for item in data]
+
+def truncate(text:str,budget:int,data=None)->str:
+    chars=budget*CHARS_PER_TOKEN
+    if isinstance(data,list):
+        kept,size=[],2
+        for item in data:
+            size+=len(json.dumps(item,ensure_ascii=False,default=str))+2
+            if size>chars:
+                break
+            kept.append(item)
+        return f"{json.dumps(kept, ensure_ascii=False, default=str)}\n[showing {len(kept)} of {len(data)} items, ask for a narrower query to see the rest]"
+    return f"{text[:chars]}\n[... {approx_tokens(text) - budget} more tokens omitted, ask for a narrower query to see the rest]"
+
+def fit(message:ToolMessage,budget:int)->Optional[str]:
+    """Content for `message` within `budget` tokens without an LLM call, or None if it already fits."""
+    text=content_text(message)
+    if approx_tokens(text)<=budget:
+        return None
+    try:
+        data=json.loads(text)
+    except ValueError:
+        data=None
+    projected=project(message.name,data)
+    if projected is not None:
+        metrics.incr(f"tool_budget.{message.name}.project")
+        data,text=projected,json.dumps(projected,ensure_ascii=False,default=str)
+        if approx_tokens(text)<=budget:
+            return text
+    metrics.incr(f"tool_budget.{message.name}.truncate")
+    return truncate(text,budget,data)
+
+def pending_results(messages:List[BaseMessage])->List[ToolMessage]:
+    """Tool messages produced since the last tool-calling AI message."""
+    results=[]
+    for message in reversed(messages):
+        if isinstance(message,AIMessage):
+            break
+        if isinstance(message,ToolMessage):
+            results.append(message)
+    return results[::-1]
+
+# Same message id, so the add_messages reducer replaces the original in the state.
+def replaced(message:ToolMessage,content:str)->ToolMessage:
+    before,after=approx_tokens(content_text(message)),approx_tokens(content)
+    metrics.incr("tool_budget.fired")
+    metrics.incr("tool_budget.tokens_saved",before-after)
+    return message.model_copy(update={"content":content,"artifact":None})
+
+def over_budget(messages:List[BaseMessage]):
+    for message in pending_results(messages):
+        metrics.incr("tool_budget.checked")
+        budget=result_budget(message.name or "")
+        if approx_tokens(content_text(message))>budget:
+            yield message,budget
+
+def summary_request(message:ToolMessage,budget:int)->str:
+    metrics.incr(f"tool_budget.{message.name}.summarize")
+    return SUMMARY_PROMPT.format(tool=message.name,words=budget*3//4,content=content_text(message))
+
+def budget_tool_results(state,summarizer)->dict:
+    updates=[]
+    for message,budget in over_budget(state["messages"]):
+        if message.name in TOOL_RESULT_SUMMARIZE:
+            content=summarizer.invoke(summary_request(message,budget)).content
+            content=fit(message.model_copy(update={"content":content}),budget) or content
+        else:
+            content=fit(message,budget)
+        updates.append(replaced(message,content))
+    return {"messages":updates}
+
+async def abudget_tool_results(state,summarizer)->dict:
+    updates=[]
+    for message,budget in over_budget(state["messages"]):
+        if message.name in TOOL_RESULT_SUMMARIZE:
+            content=(await summarizer.ainvoke(summary_request(message,budget))).content
+            content=fit(message.model_copy(update={"content":content}),budget) or content
+        else:
+            content=fit(message,budget)
+        updates.append(replaced(message,content))
+    return {"messages":updates}
@@ -0,0 +1,78 @@
+# Read-only tool results cached per (project, integration, tool, args) with a
+# per-tool TTL; a tool in WRITE_TOOLS drops its integration's entries.
+import json
+import os
+from typing import Dict,Hashable,Optional
+
+from langchain_core.messages import ToolMessage
+
+import metrics
+from cache import MISSING,StatsCache
+from tool_node import env_key
+
+TOOL_CACHE_SIZE=int(os.environ.get('TOOL_CACHE_SIZE',2048))
+
+# Seconds a result stays valid. Tools not listed here are never cached.
+TOOL_CACHE_TTLS:Dict[str,float]={
+    "get_calendars_info":600,
+    "get_channelid_name_dict":600,
+    "get_projects":600,
+    "list_branches_in_repo":120,
+    "get_issues":60,
+    "list_open_pull_requests":60,
+    "get_latest_release":300,
+    "get_releases":300,
+}
+
+# Tools with side effects on their integration's data.
+WRITE_TOOLS=frozenset({
+    "create_calendar_event","update_calendar_event","delete_calendar_event","move_calendar_event",
+    "create_issue","catch_all_jira_api","create_confluence_page",
+    "comment_on_issue","create_pull_request","create_file","update_file","delete_file",
+    "create_branch","set_active_branch","create_review_request",
+    "send_message","schedule_message",
+})
+
+def cache_ttl(tool_name:str)->float:
+    return float(os.environ.get(f'TOOL_CACHE_TTL_{env_key(tool_name)}',TOOL_CACHE_TTLS.get(tool_name,0)))
+
+def normalize_args(args:dict)->str:
+    return json.dumps({k:v for k,v in args.items() if v is not None},sort_keys=True,default=str)
+
+def call_scope(config)->Optional[str]:
+    api_keys=(config.get('configurable') or {}).get('__api_keys')
+    if api_keys is None:
+        return None
+    return api_keys.project_id
+
+class ToolResultCache:
+    def __init__(self,name:str="tool_results",maxsize:int=TOOL_CACHE_SIZE):
+        # values are (ttl, message)
+        self.cache=StatsCache(name,maxsize=maxsize,ttu=lambda key,value,now:now+value[0])
+
+    def key(self,call,integration:str,config)->Optional[Hashable]:
+        scope=call_scope(config)
+        if scope is None or cache_ttl(call["name"])<=0:
+            return None
+        return (scope,integration,call["name"],normalize_args(call["args"]))
+
+    def get(self,key:Hashable,call)->Optional[ToolMessage]:
+        entry=self.cache.get(key)
+        if entry is MISSING:
+            return None
+        message=entry[1]
+        metrics.incr(f"tool.{call['name']}_cache_hits")
+        return message.model_copy(update={"tool_call_id":call["id"],"id":None})
+
+    def set(self,key:Hashable,message):
+        if isinstance(message,ToolMessage) and message.status!="error":
+            self.cache.set(key,(cache_ttl(key[2]),message))
+
+    def invalidate_after(self,call,integration:str,config)->int:
+        """Drop cached reads of `integration` if `call` may have changed its data."""
+        scope=call_scope(config)
+        if call["name"] not in WRITE_TOOLS or scope is None:
+            return 0
+        return self.cache.invalidate_where(lambda key,value:key[0]==scope and key[1]==integration)
+
+tool_results=ToolResultCache()
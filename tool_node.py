@@ -0,0 +1,166 @@
+# ToolNode that runs a turn's tool calls concurrently, with a semaphore per
+# integration (TOOL_CONCURRENCY_<INTEGRATION>), a timeout per call (TOOL_TIMEOUT)
+# and an optional tool_cache for read-only results.
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict,Optional
+
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool,StructuredTool
+from langgraph.prebuilt import ToolNode
+
+import metrics
+
+TOOL_CONCURRENCY=int(os.environ.get('TOOL_CONCURRENCY',4))
+TOOL_TIMEOUT=float(os.environ.get('TOOL_TIMEOUT',30))
+TOOL_TIMEOUT_WORKERS=int(os.environ.get('TOOL_TIMEOUT_WORKERS',32))
+
+def env_key(name:str)->str:
+    return "".join(c if c.isalnum() else "_" for c in name).upper()
+
+def concurrency_limit(integration:str)->int:
+    return int(os.environ.get(f'TOOL_CONCURRENCY_{env_key(integration)}',TOOL_CONCURRENCY))
+
+def tool_timeout(tool_name:str)->float:
+    return float(os.environ.get(f'TOOL_TIMEOUT_{env_key(tool_name)}',TOOL_TIMEOUT))
+
+def timeout_message(call,timeout:float)->ToolMessage:
+    metrics.incr(f"tool.{call['name']}_timeouts")
+    return ToolMessage(
+        content=f"Error: {call['name']} did not finish within {timeout:g} seconds. Tell the user the tool timed out, do not retry it in this turn.",
+        name=call["name"],
+        tool_call_id=call["id"],
+        status="error",
+    )
+
+def runs_in_thread(tool)->bool:
+    """Whether the tool's async path just runs its sync code in a thread, which a timeout cannot stop."""
+    if tool is None:
+        return False
+    if isinstance(tool,StructuredTool):
+        return tool.coroutine is None
+    return type(tool)._arun is BaseTool._arun
+
+def release_on(loop,limit:asyncio.Semaphore):
+    try:
+        loop.call_soon_threadsafe(limit.release)
+    except RuntimeError:
+        pass  # the loop is gone and its semaphores with it
+
+class BoundedToolNode(ToolNode):
+    def __init__(self,tools,integrations:Optional[Dict[str,str]]=None,cache=None,**kwargs):
+        super().__init__(tools,**kwargs)
+        self.integrations=integrations or {}
+        self.cache=cache
+        self._thread_limits:Dict[str,threading.BoundedSemaphore]={}
+        self._async_limits:Dict[tuple,asyncio.Semaphore]={}
+        self._limits_lock=threading.Lock()
+        # sync calls run here so a hung tool can be abandoned after its timeout
+        self._pool=ThreadPoolExecutor(max_workers=TOOL_TIMEOUT_WORKERS,thread_name_prefix="tool")
+
+    def integration(self,tool_name:str)->str:
+        return self.integrations.get(tool_name,tool_name)
+
+    def thread_limit(self,tool_name:str)->threading.BoundedSemaphore:
+        integration=self.integration(tool_name)
+        with self._limits_lock:
+            if integration not in self._thread_limits:
+                self._thread_limits[integration]=threading.BoundedSemaphore(concurrency_limit(integration))
+            return self._thread_limits[integration]
+
+    def async_limit(self,tool_name:str)->asyncio.Semaphore:
+        # asyncio semaphores belong to one event loop
+        integration=self.integration(tool_name)
+        key=(id(asyncio.get_running_loop()),integration)
+        if key not in self._async_limits:
+            self._async_limits[key]=asyncio.Semaphore(concurrency_limit(integration))
+        return self._async_limits[key]
+
+    def cached(self,call,config):
+        """Return (cache key, cached ToolMessage or None)."""
+        if self.cache is None:
+            return None,None
+        key=self.cache.key(call,self.integration(call["name"]),config)
+        return key,(self.cache.get(key,call) if key is not None else None)
+
+    def store(self,key,call,config,message):
+        if self.cache is None:
+            return
+        if key is not None:
+            self.cache.set(key,message)
+        self.cache.invalidate_after(call,self.integration(call["name"]),config)
+
+    def _run_one(self,call,input_type,config):
+        key,hit=self.cached(call,config)
+        if hit is not None:
+            return hit
+        message=self._run_bounded(call,input_type,config)
+        self.store(key,call,config,message)
+        return message
+
+    async def _arun_one(self,call,input_type,config):
+        key,hit=self.cached(call,config)
+        if hit is not None:
+            return hit
+        message=await self._arun_bounded(call,input_type,config)
+        self.store(key,call,config,message)
+        return message
+
+    def _run_bounded(self,call,input_type,config):
+        timeout=tool_timeout(call["name"])
+        start=time.perf_counter()
+        try:
+            limit=self.thread_limit(call["name"])
+            limit.acquire()
+            metrics.observe(f"tool.{call['name']}_wait_ms",(time.perf_counter()-start)*1000)
+            context=contextvars.copy_context()
+            try:
+                future=self._pool.submit(context.run,super()._run_one,call,input_type,config)
+            except BaseException:
+                limit.release()
+                raise
+            # released when the tool actually finishes, a timed out call still holds its slot
+            future.add_done_callback(lambda _:limit.release())
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                # the thread keeps running, but the turn moves on
+                return timeout_message(call,timeout)
+        finally:
+            metrics.observe(f"tool.{call['name']}_ms",(time.perf_counter()-start)*1000)
+
+    async def _arun_bounded(self,call,input_type,config):
+        timeout=tool_timeout(call["name"])
+        start=time.perf_counter()
+        try:
+            limit=self.async_limit(call["name"])
+            await limit.acquire()
+            metrics.observe(f"tool.{call['name']}_wait_ms",(time.perf_counter()-start)*1000)
+            if not runs_in_thread(self.tools_by_name.get(call["name"])):
+                # a native coroutine is cancelled on timeout, so the slot can go right away
+                try:
+                    return await asyncio.wait_for(super()._arun_one(call,input_type,config),timeout)
+                except asyncio.TimeoutError:
+                    return timeout_message(call,timeout)
+                finally:
+                    limit.release()
+            loop=asyncio.get_running_loop()
+            context=contextvars.copy_context()
+            try:
+                future=self._pool.submit(context.run,super()._run_one,call,input_type,config)
+            except BaseException:
+                limit.release()
+                raise
+            # as on the sync path, a timed out call holds its slot until its thread finishes
+            future.add_done_callback(lambda _:release_on(loop,limit))
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future),timeout)
+            except asyncio.TimeoutError:
+                return timeout_message(call,timeout)
+        finally:
+            metrics.observe(f"tool.{call['name']}_ms",(time.perf_counter()-start)*1000)
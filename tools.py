@@ -1,43 +1,82 @@
-from socket import fromfd
-from custom_tools.jira_tool import JiraToolkit
-from custom_tools.slack_tool import SlackToolkit
-from custom_tools.github_tool import GitHubToolkit
-from custom_tools.calendar_tool import CalendarToolkit
-from custom_tools.meeting_retriever import retrieve_or_list_meetings
 import os
+import threading
 
+# Filled by load_tools(), on first use or from the app lifespan.
 tools=[]
+# tool name -> integration, used for per-integration concurrency caps
+TOOL_INTEGRATIONS={}
+_tools_lock=threading.Lock()
+_tools_loaded=False
 
-try:
-    calendar_toolkit = CalendarToolkit()
-    calendar_tools=calendar_toolkit.get_tools()
-    tools.extend(calendar_tools)
-except Exception as error:
-    print("Calendar Tool error: ",error)
-
-try:
-    toolkit = JiraToolkit.from_config()
-    jira_tools = toolkit.get_tools()
-    tools.extend(jira_tools)
-except Exception as error:
-    print("Jira Tool error: ",error)
-
-try:
-    with open(os.environ['GITHUB_APP_PRIVATE_FILE']) as f:
-        github_toolkit = GitHubToolkit.from_file()
-        github_tools = github_toolkit.get_tools()
-        tools.extend(github_tools)
-except Exception as error:
-    print("GitHub Tool error: ",error)
-
-try:
-    slack_toolkit = SlackToolkit()
-    slack_tools = slack_toolkit.get_tools()
-    tools.extend(slack_tools)
-except Exception as error:
-    print("Slack Tool error: ",error)
-
-try:
-    tools.append(retrieve_or_list_meetings)
-except Exception as error:
-    print("Meetings Tool error: ",error)
+def add_tools(integration,new_tools):
+    tools.extend(new_tools)
+    TOOL_INTEGRATIONS.update({tool.name:integration for tool in new_tools})
+
+def load_tools():
+    # The toolkits pull in the Google, Slack, GitHub and Pinecone clients,
+    # so they are only imported here.
+    try:
+        from custom_tools.calendar_tool import CalendarToolkit
+        calendar_toolkit = CalendarToolkit()
+        calendar_tools=calendar_toolkit.get_tools()
+        add_tools("calendar",calendar_tools)
+    except Exception as error:
+        print("Calendar Tool error: ",error)
+
+    try:
+        from custom_tools.jira_tool import JiraToolkit
+        toolkit = JiraToolkit.from_config()
+        jira_tools = toolkit.get_tools()
+        add_tools("jira",jira_tools)
+    except Exception as error:
+        print("Jira Tool error: ",error)
+
+    try:
+        from custom_tools.github_tool import GitHubToolkit
+        with open(os.environ['GITHUB_APP_PRIVATE_FILE']) as f:
+            github_toolkit = GitHubToolkit.from_file()
+            github_tools = github_toolkit.get_tools()
+            add_tools("github",github_tools)
+    except Exception as error:
+        print("GitHub Tool error: ",error)
+
+    try:
+        from custom_tools.slack_tool import SlackToolkit
+        slack_toolkit = SlackToolkit()
+        slack_tools = slack_toolkit.get_tools()
+        add_tools("slack",slack_tools)
+    except Exception as error:
+        print("Slack Tool error: ",error)
+
+    try:
+        from custom_tools.meeting_retriever import retrieve_or_list_meetings
+        add_tools("meetings",[retrieve_or_list_meetings])
+    except Exception as error:
+        print("Meetings Tool error: ",error)
+
+def get_tools():
+    global _tools_loaded
+    if not _tools_loaded:
+        with _tools_lock:
+            if not _tools_loaded:
+                load_tools()
+                _tools_loaded=True
+    return tools
+
+# Which ApiKeys fields an integration needs before its tools are offered to the model.
+INTEGRATION_KEYS={
+    "calendar":("CALENDAR_TOKEN",),
+    "jira":("JIRA_API_TOKEN","JIRA_USERNAME","JIRA_INSTANCE_URL"),
+    "github":("GITHUB_REPOSITORY",),
+    "slack":("SLACK_USER_TOKEN",),
+    "meetings":(),
+}
+
+def enabled_integrations(api_keys):
+    if api_keys is None:
+        return frozenset(INTEGRATION_KEYS)
+    return frozenset(name for name,fields in INTEGRATION_KEYS.items() if all(getattr(api_keys,field,None) for field in fields))
+
+def enabled_tool_names(api_keys):
+    integrations=enabled_integrations(api_keys)
+    return frozenset(tool.name for tool in get_tools() if TOOL_INTEGRATIONS.get(tool.name) in integrations)
@@ -0,0 +1,120 @@
+import codecs
+import json
+import os
+import re
+from typing import Any,AsyncIterator,Iterable,List,Optional,Tuple
+
+import httpx
+
+from models import TranscriptSegment
+
+ATTENDEE_API_URL=os.environ.get('ATTENDEE_API_URL',"https://app.attendee.dev/api/v1")
+
+_http_client:Optional[httpx.AsyncClient]=None
+
+_WHITESPACE=re.compile(r"[ \t\r\n]*")
+_SEPARATOR=re.compile(r"[ \t\r\n,]*")
+
+def get_http_client()->httpx.AsyncClient:
+    """Process-wide pooled client for outbound API calls."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client=httpx.AsyncClient(
+            timeout=httpx.Timeout(10*60,connect=10),
+            limits=httpx.Limits(max_connections=int(os.environ.get('HTTP_MAX_CONNECTIONS',50)),max_keepalive_connections=10),
+        )
+    return _http_client
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client=None
+
+class JSONArrayStream:
+    """`feed` bytes of a top-level JSON array as they arrive, get back the elements completed so far."""
+
+    def __init__(self):
+        self.decoder=json.JSONDecoder()
+        self.text_decoder=codecs.getincrementaldecoder("utf-8")()
+        self.buffer=""
+        self.started=False
+        self.finished=False
+
+    def feed(self,data:bytes,final:bool=False)->List[Any]:
+        self.buffer+=self.text_decoder.decode(data,final)
+        items=[]
+        pos=_WHITESPACE.match(self.buffer,0).end()
+        if not self.started and pos<len(self.buffer):
+            if self.buffer[pos]!="[":
+                raise ValueError("Expected a JSON array")
+            self.started=True
+            pos+=1
+        while self.started and not self.finished:
+            pos=_SEPARATOR.match(self.buffer,pos).end()
+            if pos>=len(self.buffer):
+                break
+            if self.buffer[pos]=="]":
+                self.finished=True
+                pos+=1
+                break
+            try:
+                item,end=self.decoder.raw_decode(self.buffer,pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break  # element not complete yet
+            if end>=len(self.buffer) and not final:
+                break  # a bare number may continue in the next chunk
+            items.append(item)
+            pos=end
+        self.buffer=self.buffer[pos:]
+        if final and not self.finished:
+            raise ValueError("Truncated JSON array")
+        return items
+
+async def iter_transcript(bot_id:str)->AsyncIterator[dict]:
+    """Stream a bot's transcript segments from Attendee without buffering the whole body."""
+    api_key=os.environ.get("ATTENDEE_APIKEY")
+    if not api_key:
+        raise RuntimeError("Server misconfiguration: missing ATTENDEE_APIKEY")
+    headers={"Authorization":f"Token {api_key}","Content-Type":"application/json"}
+    async with get_http_client().stream("GET",f"{ATTENDEE_API_URL}/bots/{bot_id}/transcript",headers=headers) as resp:
+        if resp.status_code!=200:
+            await resp.aread()
+            raise httpx.HTTPStatusError(f"Failed to fetch transcript ({resp.status_code}): {resp.text}",request=resp.request,response=resp)
+        parser=JSONArrayStream()
+        async for chunk in resp.aiter_bytes():
+            for segment in parser.feed(chunk):
+                yield segment
+        for segment in parser.feed(b"",final=True):
+            yield segment
+
+def to_segment(raw:dict)->Optional[TranscriptSegment]:
+    """TranscriptSegment from an Attendee transcript entry, None if it has no text."""
+    text=(raw.get('transcription') or {}).get('transcript')
+    if not text:
+        return None
+    return TranscriptSegment(
+        speaker_name=raw['speaker_name'],
+        speaker_uuid=raw['speaker_uuid'],
+        speaker_user_uuid=raw.get('speaker_user_uuid'),
+        timestamp_ms=raw['timestamp_ms'],
+        duration_ms=raw['duration_ms'],
+        transcription=text,
+    )
+
+def caption_line(segment:TranscriptSegment)->str:
+    return f"[{segment.speaker_name}]: {segment.transcription}\n"
+
+def assemble_captions(segments:Iterable[TranscriptSegment])->str:
+    return "".join(caption_line(segment) for segment in segments)
+
+async def fetch_transcript(bot_id:str)->Tuple[str,List[TranscriptSegment]]:
+    """Captions text plus the non-empty segments it was built from."""
+    segments=[]
+    async for raw in iter_transcript(bot_id):
+        segment=to_segment(raw)
+        if segment is not None:
+            segments.append(segment)
+    return assemble_captions(segments),segments
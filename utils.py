@@ -9,14 +9,24 @@ import time
 from sqlalchemy.orm import Session
 from models import User,Project,ApiKey
 from models import ApiKeys
-from pinecone import Pinecone
-from langchain_openai import OpenAIEmbeddings
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pinecone import Pinecone
 
 import json
 
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+# Clients are created on first use (or from the app lifespan), not at import.
+@lru_cache(maxsize=None)
+def get_embeddings():
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings(model="text-embedding-3-large")
 
-pc = Pinecone(api_key=os.environ['PINECONE_API_KEY'])
+@lru_cache(maxsize=None)
+def get_pinecone():
+    from pinecone import Pinecone
+    return Pinecone(api_key=os.environ['PINECONE_API_KEY'])
 
 def import_google() -> Tuple[Request, Credentials]:
     """Import google libraries.
@@ -56,9 +66,8 @@ def get_google_credentials(
             creds.refresh(Request())  # type: ignore[call-arg]
     return creds
 
-from pinecone import Pinecone, ServerlessSpec
-
 def pinecone_check_index(pc:Pinecone):
+    from pinecone import ServerlessSpec
     index_name = os.environ['PINECONE_VECTOR_NAME']
 
     existing_indexes = [index_info["name"] for index_info in pc.list_indexes()]
@@ -73,8 +82,128 @@ def pinecone_check_index(pc:Pinecone):
             time.sleep(1)
 
 from fastapi import WebSocketException,status
+from sqlalchemy import event,inspect,text
+import threading
+from cache import StatsCache
+
+# (ApiKeys, Project) per user_id. Rows are also written outside this process
+# (the dashboard); those writers notify API_KEYS_CHANNEL, and the TTL bounds
+# how long an edit that was not notified can go unnoticed.
+api_keys_cache=StatsCache(
+    "api_keys_cache",
+    maxsize=int(os.environ.get('API_KEYS_CACHE_SIZE',1024)),
+    ttl=float(os.environ.get('API_KEYS_CACHE_TTL',300)),
+)
+
+def _load_and_cache_api_keys(user_id:str,db:Session):
+    keys,project=load_api_keys(user_id,db)
+    # Detach so a later commit on `db` can't expire the cached instance.
+    db.expunge(project)
+    api_keys_cache.set(user_id,(keys,project))
+    return (keys,project)
 
 def get_api_keys(user_id:str,db:Session):
+    cached=api_keys_cache.get(user_id,None)
+    if cached is not None:
+        return cached
+    return _load_and_cache_api_keys(user_id,db)
+
+def fetch_api_keys(user_id:str):
+    """get_api_keys with a short-lived session of its own, for use off the event loop."""
+    cached=api_keys_cache.get(user_id,None)
+    if cached is not None:
+        return cached
+    from database import SessionLocal
+    db=SessionLocal()
+    try:
+        # not get_api_keys: a second lookup would count this miss twice
+        return _load_and_cache_api_keys(user_id,db)
+    finally:
+        db.close()
+
+def invalidate_api_keys(user_id:Optional[str]=None,project_id:Optional[str]=None):
+    """Drop cached api keys for a user and/or every user of a project."""
+    if user_id is not None:
+        api_keys_cache.invalidate(user_id)
+    if project_id is not None:
+        api_keys_cache.invalidate_where(lambda key,value: value[1].id==project_id)
+
+# The listeners below only see this process's writes. Whatever else edits
+# ApiKey/Project/User rows (the dashboard) sends
+#   SELECT pg_notify('api_keys_changed','{"project_id":"..."}')
+# (or calls POST /internal/invalidate_api_keys), and every app/worker process
+# listening on the channel drops the matching entries.
+API_KEYS_CHANNEL='api_keys_changed'
+# Seconds between checks of the stop event, and before reconnecting after an error.
+API_KEYS_LISTEN_TIMEOUT=float(os.environ.get('API_KEYS_LISTEN_TIMEOUT',5))
+
+def on_api_keys_notification(payload:str):
+    try:
+        data=json.loads(payload) if payload else {}
+    except ValueError:
+        data={}
+    if not isinstance(data,dict) or not (data.get('user_id') or data.get('project_id')):
+        # no usable target, forget everything rather than serve stale keys
+        api_keys_cache.clear()
+        return
+    invalidate_api_keys(user_id=data.get('user_id'),project_id=data.get('project_id'))
+
+def notify_api_keys_changed(db:Session,user_id:Optional[str]=None,project_id:Optional[str]=None):
+    """Invalidate here and, on Postgres, in every process listening on API_KEYS_CHANNEL."""
+    invalidate_api_keys(user_id=user_id,project_id=project_id)
+    if db.get_bind().dialect.name=='postgresql':
+        payload=json.dumps({"user_id":user_id,"project_id":project_id})
+        db.execute(text("SELECT pg_notify(:channel,:payload)"),{"channel":API_KEYS_CHANNEL,"payload":payload})
+        db.commit()
+
+def listen_api_keys_changes(stop:threading.Event):
+    """Apply API_KEYS_CHANNEL notifications to the cache until `stop` is set."""
+    import psycopg
+    while not stop.is_set():
+        try:
+            with psycopg.connect(os.environ['DATABASE_URI'],autocommit=True) as conn:
+                conn.execute(f"LISTEN {API_KEYS_CHANNEL}")
+                # notifications sent while we were not listening are lost
+                api_keys_cache.clear()
+                while not stop.is_set():
+                    for notify in conn.notifies(timeout=API_KEYS_LISTEN_TIMEOUT):
+                        on_api_keys_notification(notify.payload)
+        except Exception as e:
+            print("Error",e)
+            stop.wait(API_KEYS_LISTEN_TIMEOUT)
+
+def start_api_keys_listener():
+    """Run listen_api_keys_changes in a daemon thread, returns the event that stops it."""
+    from database import engine
+    stop=threading.Event()
+    if engine.dialect.name=='postgresql':
+        threading.Thread(target=listen_api_keys_changes,args=(stop,),name='api-keys-listener',daemon=True).start()
+    return stop
+
+def _previous_value(target,attr:str):
+    history=inspect(target).attrs[attr].history
+    return history.deleted[0] if history.deleted else None
+
+@event.listens_for(ApiKey,'after_insert')
+@event.listens_for(ApiKey,'after_update')
+@event.listens_for(ApiKey,'after_delete')
+def _invalidate_on_api_key_change(mapper,connection,target:ApiKey):
+    invalidate_api_keys(project_id=target.projectId)
+    previous=_previous_value(target,'projectId')
+    if previous is not None:
+        invalidate_api_keys(project_id=previous)
+
+@event.listens_for(Project,'after_update')
+@event.listens_for(Project,'after_delete')
+def _invalidate_on_project_change(mapper,connection,target:Project):
+    invalidate_api_keys(project_id=target.id)
+
+@event.listens_for(User,'after_update')
+@event.listens_for(User,'after_delete')
+def _invalidate_on_user_change(mapper,connection,target:User):
+    invalidate_api_keys(user_id=target.id)
+
+def load_api_keys(user_id:str,db:Session):
     keys=ApiKeys()
     user=db.query(User).filter(User.id==user_id).first()
     if user is None:
@@ -0,0 +1,110 @@
+# Job worker for meeting ingestion and checkpoint compaction, run with
+# `python worker.py` next to the web app (WORKER_CONCURRENCY jobs at a time).
+from dotenv import load_dotenv
+load_dotenv()
+
+import asyncio
+import os
+import signal
+import socket
+import traceback
+from typing import Awaitable,Callable,Dict
+
+import checkpoints
+import ingestion
+import jobs
+import summarization
+from idempotency import session_lock
+from jobs import stage
+from graph import close_graph
+from meetings import Item,add_meeting_to_db
+from models import Job
+from transcripts import close_http_client,fetch_transcript
+from utils import start_api_keys_listener
+
+WORKER_CONCURRENCY=int(os.environ.get('WORKER_CONCURRENCY',2))
+# Seconds an idle worker waits before polling for new jobs again.
+WORKER_POLL_INTERVAL=float(os.environ.get('WORKER_POLL_INTERVAL',2))
+
+async def process_ended_meeting(payload:dict):
+    # A job whose lease expired can be claimed again while the first run is
+    # still going; never let two workers ingest the same meeting at once.
+    async with session_lock(f"meeting:{payload['meeting_id']}") as acquired:
+        if not acquired:
+            raise RuntimeError(f"Meeting {payload['meeting_id']} is being processed by another worker")
+        with stage("download"):
+            captions,segments=await fetch_transcript(payload["bot_id"])
+        await asyncio.to_thread(add_meeting_to_db,Item(user_id=payload["user_id"],meeting_id=payload["meeting_id"],caption=captions,segments=segments))
+
+async def compact_checkpoints(payload:dict):
+    try:
+        with stage("compact"):
+            totals=await asyncio.to_thread(checkpoints.compact,payload.get("keep",checkpoints.CHECKPOINT_KEEP_LAST))
+        print("Checkpoint compaction: ",totals)
+    finally:
+        # also after a failure, or compaction stops for good once this job runs out of attempts
+        await asyncio.to_thread(checkpoints.schedule_next_compaction)
+
+HANDLERS:Dict[str,Callable[[dict],Awaitable]]={"meeting.ended":process_ended_meeting,checkpoints.COMPACT_JOB:compact_checkpoints}
+
+async def keep_lease(job:Job,worker_id:str):
+    while True:
+        await asyncio.sleep(jobs.JOB_VISIBILITY_TIMEOUT/3)
+        if not await asyncio.to_thread(jobs.heartbeat,job,worker_id):
+            print(f"Lost lease on job {job.id}")
+            return
+
+async def run_job(job:Job,worker_id:str):
+    lease=asyncio.create_task(keep_lease(job,worker_id))
+    with jobs.collect_stages() as stages:
+        try:
+            with stage("total"):
+                await HANDLERS[job.kind](job.payload)
+        except Exception as e:
+            traceback.print_exc()
+            await asyncio.to_thread(jobs.fail,job,worker_id,f"{type(e).__name__}: {e}",dict(stages))
+        else:
+            await asyncio.to_thread(jobs.complete,job,worker_id,dict(stages))
+        finally:
+            lease.cancel()
+
+async def worker_loop(worker_id:str,stopping:asyncio.Event):
+    while not stopping.is_set():
+        try:
+            job=await asyncio.to_thread(jobs.claim,worker_id,HANDLERS.keys())
+        except Exception as e:
+            print("Error while claiming job: ",e)
+            job=None
+        if job is None:
+            try:
+                await asyncio.wait_for(stopping.wait(),timeout=WORKER_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await run_job(job,worker_id)
+
+async def main():
+    jobs.ensure_job_table()
+    ingestion.ensure_embedding_cache_table()
+    summarization.ensure_summary_cache_table()
+    checkpoints.ensure_compaction_scheduled()
+    # meetings.py caches api keys too, keep them in step with the dashboard
+    stop_listener=start_api_keys_listener()
+    stopping=asyncio.Event()
+    loop=asyncio.get_running_loop()
+    for sig in (signal.SIGINT,signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig,stopping.set)
+        except NotImplementedError:
+            pass
+    prefix=f"{socket.gethostname()}:{os.getpid()}"
+    print(f"Worker {prefix} started with {WORKER_CONCURRENCY} slots")
+    try:
+        await asyncio.gather(*(worker_loop(f"{prefix}:{i}",stopping) for i in range(WORKER_CONCURRENCY)))
+    finally:
+        stop_listener.set()
+        await close_http_client()
+        await asyncio.to_thread(close_graph)
+
+if __name__=="__main__":
+    asyncio.run(main())